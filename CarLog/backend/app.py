@@ -22,31 +22,84 @@ Legacy endpoints (backward compatible):
 """
 
 import os
-import sys
 import logging
+import sqlite3
+from decimal import Decimal
+
+import orjson
+
+# Setup logging. Deployments capture stdout, so a log file is opt-in.
+_log_handlers = [logging.StreamHandler()]
+if os.environ.get('CARLOG_LOG_FILE'):
+    _log_handlers.append(logging.FileHandler(os.environ['CARLOG_LOG_FILE']))
 
-# Setup logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-    handlers=[
-        logging.FileHandler('carlog_backend.log'),
-        logging.StreamHandler()
-    ]
+    handlers=_log_handlers
 )
 logger = logging.getLogger(__name__)
 
-# Add project root to path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
-from flask import Flask, jsonify
+from flask import Flask, Response, request
+from werkzeug.exceptions import HTTPException
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 
+try:
+    from flask_compress import Compress
+except ImportError:  # optional; responses are then sent uncompressed
+    Compress = None
+
 # Import route registration function
 from routes import register_blueprints
+from routes._utils import invalidate_cached_responses, is_write_request
+from services.base_service import ValidationError, NotFoundError
+from db.db_helper import (
+    bind_request_connection,
+    unbind_request_connection,
+    begin_request_transaction,
+    end_request_transaction,
+)
+
+
+class CarLogJSONProvider(JSONProvider):
+    """
+    orjson-backed JSON provider, used by jsonify() and request.get_json().
+    
+    orjson handles datetime, UUID and dataclasses natively; default() covers
+    the remaining types handlers return, such as sqlite3.Row results.
+    """
+
+    option = orjson.OPT_NON_STR_KEYS
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, sqlite3.Row):
+            return dict(o)
+        if isinstance(o, Decimal):
+            return str(o)
+        if hasattr(o, '__html__'):
+            return str(o.__html__())
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def dumps_bytes(self, obj):
+        """Serialize obj straight to UTF-8 bytes."""
+        return orjson.dumps(obj, default=self.default, option=self.option)
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype='application/json')
+
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = CarLogJSONProvider(app)
 
 # Enable CORS for all routes
 CORS(app, resources={
@@ -57,102 +110,192 @@ CORS(app, resources={
     }
 })
 
+# Compress JSON (and msgpack) bodies for clients that accept it; list
+# payloads repeat the same keys on every row and shrink several-fold.
+# Bodies under COMPRESS_MIN_SIZE aren't worth the CPU. Streamed lists are
+# compressed chunk by chunk, and Vary: Accept-Encoding is added.
+if Compress is not None:
+    app.config.update(
+        COMPRESS_ALGORITHM=['br', 'zstd', 'gzip'],
+        COMPRESS_MIN_SIZE=512,
+        COMPRESS_MIMETYPES=['application/json', 'application/msgpack'],
+    )
+    Compress(app)
+
 # Register all blueprints (new API + legacy)
 register_blueprints(app)
 
+
+@app.before_request
+def acquire_db_connection():
+    """Borrow a pooled connection for this request (registered first)."""
+    bind_request_connection()
+
+
+@app.before_request
+def begin_write_transaction():
+    """Run all writes of a mutating request in one transaction (one commit)."""
+    if is_write_request():
+        begin_request_transaction()
+
+
+@app.after_request
+def finish_write_transaction(response):
+    """Commit a mutating request's writes only if it succeeded."""
+    if is_write_request():
+        committed = response.status_code < 400
+        end_request_transaction(commit=committed)
+        if committed:
+            invalidate_cached_responses()
+    return response
+
+
+@app.teardown_appcontext
+def release_db_connection(error):
+    """
+    Roll back anything a request left uncommitted and return its
+    connection to the pool. Pooling (rather than one connection per
+    thread) also covers gevent, where every request is a new greenlet.
+    """
+    unbind_request_connection()
+
+
 # Ensure database is initialized
 try:
     from db.db_helper import ensure_initialized
     ensure_initialized()
     logger.info("Database initialized successfully")
 except Exception as e:
-    logger.warning(f"Database initialization check failed: {e}")
+    logger.warning("Database initialization check failed: %s", e)
 
 
 # =============================================================================
 # Root Routes
 # =============================================================================
 
+# These payloads never change while the process runs, so they are
+# serialized once here instead of on every request.
+_HOME_BODY = app.json.dumps_bytes({
+    'name': 'CarLog API',
+    'version': '2.0.0',
+    'status': 'running',
+    'endpoints': {
+        'vehicles': '/api/vehicles',
+        'repairs': '/api/repairs',
+        'fuel_logs': '/api/fuel-logs',
+        'maintenance': '/api/maintenance',
+        'mileage': '/api/mileage',
+        'trips': '/api/trips',
+        'analytics': '/api/analytics',
+        'settings': '/api/settings',
+        'users': '/api/users'
+    },
+    'legacy_endpoints': {
+        'vehicle': '/car/<vin>',
+        'maintenance': '/maintenance/<vin>',
+        'repairs': '/repair/repairs/<vin>',
+        'fuel': '/fuel/'
+    }
+})
+
+_HEALTH_BODY = app.json.dumps_bytes({
+    'status': 'healthy',
+    'database': 'connected'
+})
+
+_API_INFO_BODY = app.json.dumps_bytes({
+    'name': 'CarLog API',
+    'version': '2.0.0',
+    'description': 'Vehicle maintenance and cost tracking API',
+    'documentation': '/api/docs'
+})
+
+_STATIC_CACHE_HEADERS = {'Cache-Control': 'public, max-age=300'}
+
+
 @app.route('/')
 def home():
     """API root endpoint."""
-    return jsonify({
-        'name': 'CarLog API',
-        'version': '2.0.0',
-        'status': 'running',
-        'endpoints': {
-            'vehicles': '/api/vehicles',
-            'repairs': '/api/repairs',
-            'fuel_logs': '/api/fuel-logs',
-            'maintenance': '/api/maintenance',
-            'mileage': '/api/mileage',
-            'trips': '/api/trips',
-            'analytics': '/api/analytics',
-            'settings': '/api/settings',
-            'users': '/api/users'
-        },
-        'legacy_endpoints': {
-            'vehicle': '/car/<vin>',
-            'maintenance': '/maintenance/<vin>',
-            'repairs': '/repair/repairs/<vin>',
-            'fuel': '/fuel/'
-        }
-    })
+    return Response(_HOME_BODY, mimetype='application/json', headers=_STATIC_CACHE_HEADERS)
 
 
 @app.route('/health')
 def health_check():
     """Health check endpoint."""
-    return jsonify({
-        'status': 'healthy',
-        'database': 'connected'
-    })
+    return Response(_HEALTH_BODY, mimetype='application/json')
 
 
 @app.route('/api')
 def api_info():
     """API information endpoint."""
-    return jsonify({
-        'name': 'CarLog API',
-        'version': '2.0.0',
-        'description': 'Vehicle maintenance and cost tracking API',
-        'documentation': '/api/docs'
-    })
+    return Response(_API_INFO_BODY, mimetype='application/json', headers=_STATIC_CACHE_HEADERS)
 
 
 # =============================================================================
 # Error Handlers
 # =============================================================================
 
+_NOT_FOUND_BODY = app.json.dumps_bytes({
+    'success': False,
+    'error': 'Resource not found',
+    'status': 404
+})
+
+_INTERNAL_ERROR_BODY = app.json.dumps_bytes({
+    'success': False,
+    'error': 'Internal server error',
+    'status': 500
+})
+
+_METHOD_NOT_ALLOWED_BODY = app.json.dumps_bytes({
+    'success': False,
+    'error': 'Method not allowed',
+    'status': 405
+})
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors."""
-    return jsonify({
-        'success': False,
-        'error': 'Resource not found',
-        'status': 404
-    }), 404
+    return Response(_NOT_FOUND_BODY, status=404, mimetype='application/json')
 
 
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors."""
-    logger.error(f"Internal server error: {error}")
-    return jsonify({
-        'success': False,
-        'error': 'Internal server error',
-        'status': 500
-    }), 500
+    logger.error("Internal server error: %s", error)
+    return Response(_INTERNAL_ERROR_BODY, status=500, mimetype='application/json')
 
 
 @app.errorhandler(405)
 def method_not_allowed(error):
     """Handle 405 errors."""
-    return jsonify({
-        'success': False,
-        'error': 'Method not allowed',
-        'status': 405
-    }), 405
+    return Response(_METHOD_NOT_ALLOWED_BODY, status=405, mimetype='application/json')
+
+
+@app.errorhandler(ValidationError)
+def validation_error(error):
+    """Handle service validation failures raised from any route."""
+    return app.json.response({'success': False, 'error': error.message}), 400
+
+
+@app.errorhandler(NotFoundError)
+def not_found_error(error):
+    """Handle missing resources reported by the service layer."""
+    return app.json.response({'success': False, 'error': error.message}), 404
+
+
+@app.errorhandler(HTTPException)
+def http_error(error):
+    """Handle any other HTTP error (e.g. malformed JSON bodies) in the API shape."""
+    return app.json.response({'success': False, 'error': error.description}), error.code
+
+
+@app.errorhandler(Exception)
+def unhandled_error(error):
+    """Handle exceptions the routes no longer catch themselves."""
+    logger.exception("Unhandled error on %s %s", request.method, request.path)
+    return app.json.response({'success': False, 'error': str(error)}), 500
 
 
 # =============================================================================
@@ -164,7 +307,12 @@ if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_DEBUG', 'true').lower() == 'true'
     
-    logger.info(f"Starting CarLog API on port {port} (debug={debug})")
+    logger.info("Starting CarLog API on port %s (debug=%s)", port, debug)
+    
+    # The built-in server is for local development only. In production run:
+    #   gunicorn app:app   (settings in gunicorn.conf.py)
+    if not debug:
+        logger.warning("Using the development server; run under gunicorn in production")
     
     app.run(
         host='0.0.0.0',
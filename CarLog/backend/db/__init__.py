@@ -6,10 +6,28 @@ Provides database access and management utilities.
 
 from .db_helper import (
     get_connection,
+    get_thread_connection,
+    reset_thread_connection,
+    close_thread_connection,
+    acquire_connection,
+    release_connection,
+    bind_request_connection,
+    unbind_request_connection,
     connection,
     transaction,
+    begin_request_transaction,
+    end_request_transaction,
     execute_query,
+    select_one,
+    select_all,
+    select_rows,
+    select_tuples,
+    select_described,
+    head_join_sql,
+    iter_rows,
+    execute_dml,
     execute_insert,
+    bulk_insert,
     execute_update,
     execute_delete,
     row_to_dict,
@@ -21,10 +39,28 @@ from .db_helper import (
 
 __all__ = [
     'get_connection',
+    'get_thread_connection',
+    'reset_thread_connection',
+    'close_thread_connection',
+    'acquire_connection',
+    'release_connection',
+    'bind_request_connection',
+    'unbind_request_connection',
     'connection',
     'transaction', 
+    'begin_request_transaction',
+    'end_request_transaction',
     'execute_query',
+    'select_one',
+    'select_all',
+    'select_rows',
+    'select_tuples',
+    'select_described',
+    'head_join_sql',
+    'iter_rows',
+    'execute_dml',
     'execute_insert',
+    'bulk_insert',
     'execute_update',
     'execute_delete',
     'row_to_dict',
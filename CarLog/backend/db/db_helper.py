@@ -7,9 +7,16 @@ Implements context managers for safe connection handling.
 
 import sqlite3
 import os
+import atexit
 import logging
+import threading
+import time
 from contextlib import contextmanager
-from typing import Optional, List, Dict, Any, Union
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Union, Iterator, Tuple
+
+from .pool import ConnectionPool, WriteLock
+from .schema import MONTHLY_TOTALS_SCHEMA, MONTHLY_TOTALS_BACKFILL
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -18,6 +25,29 @@ logger = logging.getLogger(__name__)
 DB_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(DB_DIR, "carlog.db")
 
+# Stored in PRAGMA user_version; bump when adding a migration step to
+# ensure_initialized
+SCHEMA_VERSION = 10
+
+# Per-connection tuning. WAL lets readers run alongside a single writer and,
+# with synchronous=NORMAL, only fsyncs on checkpoint instead of every commit.
+CONNECTION_PRAGMAS = """
+    PRAGMA synchronous = NORMAL;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA mmap_size = 268435456;
+    PRAGMA cache_size = -20000;
+    PRAGMA wal_autocheckpoint = 1000;
+    PRAGMA foreign_keys = ON;
+"""
+
+# SQLite VM instructions between yields while a read runs, see
+# _yield_during_reads
+QUERY_YIELD_OPS = 100_000
+
+# journal_mode=WAL is persistent in the database file, so it only needs to be
+# issued once per file rather than on every connection.
+_wal_enabled = set()
+
 
 def get_connection() -> sqlite3.Connection:
     """
@@ -27,37 +57,169 @@ def get_connection() -> sqlite3.Connection:
     Note: Caller is responsible for closing the connection.
     For automatic handling, use the `connection()` context manager.
     """
-    conn = sqlite3.connect(DB_PATH)
+    # sqlite3 keeps compiled statements per connection, keyed by SQL text;
+    # with connections reused per thread a bigger cache means fewer re-prepares.
+    # Each connection is only ever used by one thread/greenlet at a time, so
+    # the same-thread check is redundant; isolation_level=None leaves BEGIN
+    # to transaction() and begin_request_transaction() instead of sqlite3
+    # issuing implicit ones before every write.
+    conn = sqlite3.connect(
+        DB_PATH,
+        cached_statements=256,
+        check_same_thread=False,
+        isolation_level=None
+    )
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+    if DB_PATH not in _wal_enabled:
+        conn.execute("PRAGMA journal_mode = WAL")
+        _wal_enabled.add(DB_PATH)
+    conn.executescript(CONNECTION_PRAGMAS)
+    conn.set_progress_handler(_yield_during_reads(conn), QUERY_YIELD_OPS)
+    return conn
+
+
+def _yield_during_reads(conn: sqlite3.Connection):
+    """
+    Progress handler that sleeps for zero seconds every QUERY_YIELD_OPS VM
+    steps. A query blocks the calling thread, and under gunicorn's gevent
+    worker that is every request in the process; the patched sleep lets
+    other requests run while a long read is still executing. Connections in
+    a transaction never yield, so the write lock is not held across a switch.
+    """
+    def handler():
+        if not conn.in_transaction:
+            time.sleep(0)
+        return 0
+    return handler
+
+
+# One long-lived connection per thread, reused by every helper below
+_local = threading.local()
+_open_connections = []
+
+# Connections handed to HTTP requests. Keeping them open across requests
+# keeps SQLite's page cache and statement cache warm.
+POOL_SIZE = int(os.environ.get('CARLOG_DB_POOL_SIZE', 8))
+POOL_MAX_OVERFLOW = int(os.environ.get('CARLOG_DB_POOL_OVERFLOW', 20))
+_pool = ConnectionPool(get_connection, size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW)
+_write_lock = WriteLock()
+
+
+def _current_connection() -> Optional[sqlite3.Connection]:
+    """The connection helpers use right now: the request's, else the thread's."""
+    return getattr(_local, 'request_conn', None) or getattr(_local, 'conn', None)
+
+
+def get_thread_connection() -> sqlite3.Connection:
+    """
+    Get the connection for the current request or thread.
+    
+    Inside a request this is the pooled connection bound by
+    bind_request_connection(). Elsewhere (startup, scripts) each thread
+    lazily opens its own. Reusing the connection skips the file open,
+    PRAGMA setup and schema parse that a fresh connection pays. Do not
+    close it; it is closed automatically when the process exits.
+    """
+    conn = _current_connection()
+    if conn is None:
+        conn = get_connection()
+        _local.conn = conn
+        _open_connections.append(conn)
     return conn
 
 
+def reset_thread_connection() -> None:
+    """Roll back any transaction left open on this thread's connection."""
+    conn = _current_connection()
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+
+def close_thread_connection() -> None:
+    """Close this thread's shared connection and forget it."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        return
+    _local.conn = None
+    try:
+        _open_connections.remove(conn)
+    except ValueError:
+        pass
+    conn.close()
+
+
+def acquire_connection() -> sqlite3.Connection:
+    """Check a connection out of the process-wide pool."""
+    return _pool.acquire()
+
+
+def release_connection(conn: sqlite3.Connection) -> None:
+    """Return a connection to the pool (closing it if it was overflow)."""
+    _pool.release(conn)
+
+
+def bind_request_connection() -> None:
+    """Give the current request (thread or greenlet) a pooled connection."""
+    _local.request_conn = acquire_connection()
+
+
+def unbind_request_connection() -> None:
+    """Hand the current request's connection back to the pool."""
+    _release_write_lock()
+    conn = getattr(_local, 'request_conn', None)
+    if conn is not None:
+        _local.request_conn = None
+        release_connection(conn)
+
+
+def _release_write_lock() -> None:
+    """Let the next writer in if this request or thread holds the write lock."""
+    if getattr(_local, 'holds_write_lock', False):
+        _local.holds_write_lock = False
+        _write_lock.release()
+
+
+@atexit.register
+def _close_open_connections() -> None:
+    """Close every shared connection on interpreter exit."""
+    _pool.close_all()
+    while _open_connections:
+        conn = _open_connections.pop()
+        try:
+            # Let SQLite refresh planner stats for the queries this
+            # connection ran before it goes away
+            conn.execute("PRAGMA optimize")
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
 @contextmanager
 def connection():
     """
     Context manager for database connections.
-    Automatically handles commit/rollback and closing.
+    Automatically handles commit/rollback on the thread's shared connection.
+    The connection itself stays open for the next caller.
+    
+    If a transaction is already open when the block starts (a request-scoped
+    one from begin_request_transaction, or an outer transaction() block),
+    the block joins it and leaves commit/rollback to its owner.
     
     Usage:
         with connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM vehicles")
-            results = cursor.fetchall()
+            results = conn.execute("SELECT * FROM vehicles").fetchall()
     """
-    conn = None
+    conn = get_thread_connection()
+    owner = not conn.in_transaction
     try:
-        conn = get_connection()
         yield conn
-        conn.commit()
+        if owner:
+            conn.commit()
     except Exception as e:
-        if conn:
+        if owner:
             conn.rollback()
-        logger.error(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         raise
-    finally:
-        if conn:
-            conn.close()
 
 
 @contextmanager
@@ -72,20 +234,49 @@ def transaction():
             conn.execute("UPDATE ...")
             # Auto-commits on success, rolls back on error
     """
-    conn = None
+    conn = get_thread_connection()
+    if conn.in_transaction:
+        # Already atomic as part of the enclosing transaction
+        yield conn
+        return
     try:
-        conn = get_connection()
         conn.execute("BEGIN TRANSACTION")
         yield conn
         conn.commit()
     except Exception as e:
-        if conn:
-            conn.rollback()
-        logger.error(f"Transaction error: {e}")
+        conn.rollback()
+        logger.error("Transaction error: %s", e)
         raise
+
+
+def begin_request_transaction() -> None:
+    """
+    Open a write transaction that every helper on this thread joins until
+    end_request_transaction(), so a request's writes commit together.
+    
+    BEGIN IMMEDIATE takes the write lock up front instead of failing with
+    SQLITE_BUSY when a read is later upgraded to a write. Writers in this
+    process first queue on the pool's WriteLock, so they wait cooperatively
+    rather than in SQLite's busy handler.
+    """
+    conn = get_thread_connection()
+    if not conn.in_transaction:
+        _local.holds_write_lock = _write_lock.acquire()
+        conn.execute("BEGIN IMMEDIATE")
+
+
+def end_request_transaction(commit: bool) -> None:
+    """Commit or roll back the transaction opened by begin_request_transaction."""
+    conn = _current_connection()
+    try:
+        if conn is None or not conn.in_transaction:
+            return
+        if commit:
+            conn.commit()
+        else:
+            conn.rollback()
     finally:
-        if conn:
-            conn.close()
+        _release_write_lock()
 
 
 def row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
@@ -100,6 +291,101 @@ def rows_to_list(rows: List[sqlite3.Row]) -> List[Dict[str, Any]]:
     return [dict(row) for row in rows]
 
 
+@lru_cache(maxsize=256)
+def _is_select(query: str) -> bool:
+    """Whether a query returns rows. Cached: services reuse the same SQL text."""
+    return query.lstrip()[:6].upper() == "SELECT"
+
+
+def select_one(query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
+    """Run a SELECT and return the first row as a dict, or None."""
+    with connection() as conn:
+        row = conn.execute(query, params).fetchone()
+        return row_to_dict(row) if row else None
+
+
+def select_all(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    """Run a SELECT and return every row as a dict."""
+    with connection() as conn:
+        return rows_to_list(conn.execute(query, params).fetchall())
+
+
+def select_rows(query: str, params: tuple = ()) -> List[sqlite3.Row]:
+    """
+    Run a SELECT and return the raw sqlite3.Row objects.
+    
+    Skips the per-row dict copy; use when the result goes straight to
+    jsonify (the app's JSON provider serializes rows directly).
+    """
+    with connection() as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def select_tuples(query: str, params: tuple = ()) -> List[tuple]:
+    """
+    Run a SELECT and return plain tuples in column order.
+    
+    For aggregation code that unpacks rows positionally; tuples are cheaper
+    to build than sqlite3.Row. The row factory is overridden on this cursor
+    only, so the shared connection is unaffected.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        return cursor.execute(query, params).fetchall()
+
+
+def select_described(query: str, params: tuple = ()) -> Tuple[List[str], List[tuple]]:
+    """
+    Run a SELECT and return (column names, plain tuples).
+    
+    For results that have to be split by position, such as two row sets
+    joined side by side whose column names would collide in a dict.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(query, params)
+        return [d[0] for d in cursor.description], cursor.fetchall()
+
+
+@lru_cache(maxsize=64)
+def head_join_sql(name: str, head_sql: str, page_sql: str) -> str:
+    """
+    Build (once per combination) a statement that returns a one-row query
+    (a total, a summary) and a page of rows together: every result row is
+    the head row's columns followed by one page row's columns. An empty
+    page still yields the head row, with the page columns NULL.
+    
+    Read the result with select_described(). Building the text once keeps
+    it identical across calls, so it also hits sqlite3's statement cache.
+    """
+    return (
+        f"WITH {name} AS ({head_sql}) "
+        f"SELECT {name}.*, page.* "
+        f"FROM {name} LEFT JOIN ({page_sql}) AS page "
+        f"ORDER BY page.date DESC, page.id DESC"
+    )
+
+
+def iter_rows(query: str, params: tuple = ()) -> Iterator[Dict[str, Any]]:
+    """
+    Run a SELECT and yield rows one at a time as dicts.
+    
+    Rows are pulled from the cursor as they are consumed, so large result
+    sets (e.g. exports) are never buffered in full.
+    """
+    with connection() as conn:
+        for row in conn.execute(query, params):
+            yield dict(row)
+
+
+def execute_dml(query: str, params: tuple = ()) -> int:
+    """Run an INSERT/UPDATE/DELETE and return the affected row count."""
+    with connection() as conn:
+        return conn.execute(query, params).rowcount
+
+
 def execute_query(
     query: str, 
     params: tuple = (), 
@@ -109,6 +395,8 @@ def execute_query(
     """
     Execute a query and return results.
     
+    Prefer select_one/select_all/execute_dml when the query kind is known.
+    
     Args:
         query: SQL query string
         params: Query parameters
@@ -120,20 +408,41 @@ def execute_query(
         - For SELECT with fetch_all: list of dicts
         - For INSERT/UPDATE/DELETE: affected row count
     """
-    with connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        
-        # Check if it's a SELECT query
-        if query.strip().upper().startswith("SELECT"):
-            if fetch_one:
-                row = cursor.fetchone()
-                return row_to_dict(row) if row else None
-            else:
-                return rows_to_list(cursor.fetchall())
-        else:
-            # For INSERT, UPDATE, DELETE
-            return cursor.rowcount
+    if not _is_select(query):
+        return execute_dml(query, params)
+    if fetch_one:
+        return select_one(query, params)
+    return select_all(query, params)
+
+
+@lru_cache(maxsize=256)
+def _build_insert_sql(table: str, cols: tuple) -> str:
+    """Build (once per table/column set) an INSERT statement."""
+    _check_columns(table, cols)
+    placeholders = ", ".join(["?" for _ in cols])
+    return f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({placeholders})"
+
+
+@lru_cache(maxsize=256)
+def _build_delete_sql(table: str, where: str) -> str:
+    """Build (once per table/WHERE clause) a DELETE statement."""
+    return f"DELETE FROM {table} WHERE {where}"
+
+
+@lru_cache(maxsize=256)
+def _build_count_sql(table: str, where: Optional[str]) -> str:
+    """Build (once per table/WHERE clause) a COUNT statement."""
+    if where:
+        return f"SELECT COUNT(*) as count FROM {table} WHERE {where}"
+    return f"SELECT COUNT(*) as count FROM {table}"
+
+
+@lru_cache(maxsize=256)
+def _build_update_sql(table: str, cols: tuple, where: str) -> str:
+    """Build (once per table/column set/WHERE clause) an UPDATE statement."""
+    _check_columns(table, cols)
+    set_clause = ", ".join([f"{k} = ?" for k in cols])
+    return f"UPDATE {table} SET {set_clause}, updated_at = datetime('now') WHERE {where}"
 
 
 def execute_insert(
@@ -152,16 +461,44 @@ def execute_insert(
     Returns:
         Last inserted row ID if return_id=True, else True on success
     """
-    columns = ", ".join(data.keys())
-    placeholders = ", ".join(["?" for _ in data])
-    query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+    # Sort columns so the same key set always yields the same SQL text
+    # and hits the connection's statement cache
+    cols = tuple(sorted(data))
+    query = _build_insert_sql(table, cols)
     
     with connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, tuple(data.values()))
+        cursor = conn.execute(query, tuple(data[c] for c in cols))
         return cursor.lastrowid if return_id else True
 
 
+def bulk_insert(
+    table: str,
+    rows: List[tuple],
+    columns: List[str]
+) -> int:
+    """
+    Insert many rows into a table in one transaction.
+    
+    Prefer this over calling execute_insert in a loop: the statement is
+    compiled once and the whole batch is committed with a single sync.
+    
+    Args:
+        table: Table name
+        rows: Sequence of value tuples, ordered like ``columns``
+        columns: Column names
+        
+    Returns:
+        Number of inserted rows
+    """
+    if not rows:
+        return 0
+    
+    query = _build_insert_sql(table, tuple(columns))
+    
+    with transaction() as conn:
+        return conn.executemany(query, rows).rowcount
+
+
 def execute_update(
     table: str,
     data: Dict[str, Any],
@@ -180,14 +517,12 @@ def execute_update(
     Returns:
         Number of affected rows
     """
-    set_clause = ", ".join([f"{k} = ?" for k in data.keys()])
-    query = f"UPDATE {table} SET {set_clause}, updated_at = datetime('now') WHERE {where}"
-    params = tuple(data.values()) + where_params
+    cols = tuple(sorted(data))
+    query = _build_update_sql(table, cols, where)
+    params = tuple(data[c] for c in cols) + where_params
     
     with connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        return cursor.rowcount
+        return conn.execute(query, params).rowcount
 
 
 def execute_delete(
@@ -206,35 +541,72 @@ def execute_delete(
     Returns:
         Number of deleted rows
     """
-    query = f"DELETE FROM {table} WHERE {where}"
-    
     with connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, where_params)
-        return cursor.rowcount
+        return conn.execute(_build_delete_sql(table, where), where_params).rowcount
 
 
 def table_exists(table_name: str) -> bool:
     """Check if a table exists in the database."""
     query = "SELECT name FROM sqlite_master WHERE type='table' AND name=?"
-    result = execute_query(query, (table_name,), fetch_one=True)
+    result = select_one(query, (table_name,))
     return result is not None
 
 
+# Column names per table. The schema only changes in ensure_initialized,
+# which clears this via _invalidate_schema_cache().
+_columns_cache: Dict[str, List[str]] = {}
+
+
 def get_table_columns(table_name: str) -> List[str]:
-    """Get list of column names for a table."""
-    with connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        return [row[1] for row in cursor.fetchall()]
+    """Get list of column names for a table (cached for the process)."""
+    columns = _columns_cache.get(table_name)
+    if columns is None:
+        with connection() as conn:
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+        if columns:
+            _columns_cache[table_name] = columns
+    return list(columns)
 
 
-def count_rows(table: str, where: str = None, params: tuple = ()) -> int:
-    """Count rows in a table, optionally with a WHERE clause."""
-    query = f"SELECT COUNT(*) as count FROM {table}"
-    if where:
-        query += f" WHERE {where}"
-    result = execute_query(query, params, fetch_one=True)
+def _check_columns(table: str, cols: tuple) -> None:
+    """Reject table/column names that are not in the schema."""
+    known = get_table_columns(table)
+    if not known:
+        raise ValueError(f"Unknown table: {table}")
+    unknown = [c for c in cols if c not in known]
+    if unknown:
+        raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+
+
+def _invalidate_schema_cache() -> None:
+    """Forget cached columns and SQL after the schema changes."""
+    _columns_cache.clear()
+    _build_insert_sql.cache_clear()
+    _build_update_sql.cache_clear()
+
+
+def count_rows(
+    table: str,
+    where: str = None,
+    params: tuple = (),
+    approximate: bool = False
+) -> int:
+    """
+    Count rows in a table, optionally with a WHERE clause.
+    
+    COUNT(*) scans the whole table. With approximate=True and no WHERE
+    clause, the row estimate that ANALYZE / PRAGMA optimize stores in
+    sqlite_stat1 is returned instead when available; it can lag behind
+    recent writes.
+    """
+    if approximate and not where and table_exists('sqlite_stat1'):
+        stat = select_one(
+            "SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table,)
+        )
+        if stat and stat['stat']:
+            return int(stat['stat'].split()[0])
+    
+    result = select_one(_build_count_sql(table, where or None), params)
     return result['count'] if result else 0
 
 
@@ -256,48 +628,73 @@ def ensure_initialized():
         try:
             cursor = conn.cursor()
             
-            # Check maintenance_intervals table
-            cursor.execute("PRAGMA table_info(maintenance_intervals)")
-            columns = [col[1] for col in cursor.fetchall()]
+            # One integer read decides whether anything below needs to run.
+            # Databases from before versioning report 0, so each step still
+            # checks the table before changing it.
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            if current >= SCHEMA_VERSION:
+                return True
             
-            if 'next_due_mileage' not in columns:
-                logger.warning("Upgrading maintenance_intervals table...")
-                cursor.execute("DROP TABLE IF EXISTS maintenance_intervals")
-                cursor.execute('''
-                    CREATE TABLE maintenance_intervals (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        vin TEXT NOT NULL,
-                        service_type TEXT NOT NULL,
-                        interval_miles INTEGER,
-                        interval_months INTEGER,
-                        last_performed_mileage INTEGER,
-                        last_performed_date TEXT,
-                        next_due_mileage INTEGER,
-                        next_due_date TEXT,
-                        is_custom INTEGER DEFAULT 0,
-                        notes TEXT,
-                        created_at TEXT DEFAULT (datetime('now')),
-                        updated_at TEXT DEFAULT (datetime('now'))
-                    )
-                ''')
-                conn.commit()
-                logger.info("maintenance_intervals table upgraded")
+            # Version 2: maintenance_intervals gains next_due_* columns
+            if current < 2:
+                # Check maintenance_intervals table
+                cursor.execute("PRAGMA table_info(maintenance_intervals)")
+                columns = [col[1] for col in cursor.fetchall()]
+            
+                if 'next_due_mileage' not in columns:
+                    logger.warning("Upgrading maintenance_intervals table...")
+                    cursor.execute("DROP TABLE IF EXISTS maintenance_intervals")
+                    cursor.execute('''
+                        CREATE TABLE maintenance_intervals (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            vin TEXT NOT NULL,
+                            service_type TEXT NOT NULL,
+                            interval_miles INTEGER,
+                            interval_months INTEGER,
+                            last_performed_mileage INTEGER,
+                            last_performed_date TEXT,
+                            next_due_mileage INTEGER,
+                            next_due_date TEXT,
+                            is_custom INTEGER DEFAULT 0,
+                            notes TEXT,
+                            created_at TEXT DEFAULT (datetime('now')),
+                            updated_at TEXT DEFAULT (datetime('now'))
+                        )
+                    ''')
+                    conn.commit()
+                    logger.info("maintenance_intervals table upgraded")
             
-            # Check trips table - needs start_mileage and end_mileage columns
-            if table_exists('trips'):
+            # Version 3: trips gains start/end mileage
+            if current < 3:
+                # Check trips table - needs start_mileage and end_mileage columns
+                # table_info is empty when the table does not exist, so no
+                # separate table_exists() round-trip is needed
                 cursor.execute("PRAGMA table_info(trips)")
                 trips_columns = [col[1] for col in cursor.fetchall()]
                 
-                if 'start_mileage' not in trips_columns or 'end_mileage' not in trips_columns:
+                if trips_columns and (
+                    'start_mileage' not in trips_columns or 'end_mileage' not in trips_columns
+                ):
                     logger.warning("Upgrading trips table...")
-                    # Backup existing trips data
-                    cursor.execute("SELECT * FROM trips")
-                    old_trips = cursor.fetchall()
-                    old_columns = [col[1] for col in cursor.execute("PRAGMA table_info(trips)").fetchall()]
-                    
-                    # Create new table with correct schema
-                    cursor.execute("DROP TABLE IF EXISTS trips")
-                    cursor.execute('''
+                    new_columns = [
+                        'vin', 'start_location', 'end_location', 'start_mileage',
+                        'end_mileage', 'distance', 'date', 'purpose', 'is_business',
+                        'notes', 'created_at', 'updated_at',
+                    ]
+                    selected = []
+                    for col in new_columns:
+                        if col == 'is_business':
+                            selected.append(
+                                "COALESCE(is_business, 0)" if col in trips_columns else "0"
+                            )
+                        else:
+                            selected.append(col if col in trips_columns else "NULL")
+                
+                    # Copy rows inside SQLite instead of round-tripping them
+                    # through Python one INSERT at a time
+                    conn.executescript(f'''
+                        BEGIN;
+                        ALTER TABLE trips RENAME TO trips_old;
                         CREATE TABLE trips (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             vin TEXT NOT NULL,
@@ -313,70 +710,164 @@ def ensure_initialized():
                             created_at TEXT DEFAULT (datetime('now')),
                             updated_at TEXT DEFAULT (datetime('now')),
                             FOREIGN KEY (vin) REFERENCES vehicles(vin) ON DELETE CASCADE
-                        )
+                        );
+                        INSERT INTO trips ({", ".join(new_columns)})
+                        SELECT {", ".join(selected)} FROM trips_old;
+                        DROP TABLE trips_old;
+                        COMMIT;
                     ''')
-                    
-                    # Restore trips data if any
-                    if old_trips:
-                        for trip in old_trips:
-                            trip_dict = dict(zip(old_columns, trip))
-                            cursor.execute('''
-                                INSERT INTO trips (vin, start_location, end_location, start_mileage, end_mileage, distance, date, purpose, is_business, notes, created_at, updated_at)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            ''', (
-                                trip_dict.get('vin'),
-                                trip_dict.get('start_location'),
-                                trip_dict.get('end_location'),
-                                trip_dict.get('start_mileage'),
-                                trip_dict.get('end_mileage'),
-                                trip_dict.get('distance'),
-                                trip_dict.get('date'),
-                                trip_dict.get('purpose'),
-                                trip_dict.get('is_business', 0),
-                                trip_dict.get('notes'),
-                                trip_dict.get('created_at'),
-                                trip_dict.get('updated_at'),
-                            ))
-                    conn.commit()
                     logger.info("trips table upgraded")
             
-            # Check settings table - needs user_id column
-            cursor.execute("PRAGMA table_info(settings)")
-            settings_columns = [col[1] for col in cursor.fetchall()]
+            # Version 4: settings gains id and user_id
+            if current < 4:
+                # Check settings table - needs user_id column
+                cursor.execute("PRAGMA table_info(settings)")
+                settings_columns = [col[1] for col in cursor.fetchall()]
             
-            if 'user_id' not in settings_columns or 'id' not in settings_columns:
-                logger.warning("Upgrading settings table...")
-                # Backup existing settings
-                cursor.execute("SELECT key, value FROM settings")
-                old_settings = cursor.fetchall()
-                
-                cursor.execute("DROP TABLE IF EXISTS settings")
-                cursor.execute('''
-                    CREATE TABLE settings (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        key TEXT NOT NULL,
-                        value TEXT,
-                        user_id INTEGER,
-                        created_at TEXT DEFAULT (datetime('now')),
-                        updated_at TEXT DEFAULT (datetime('now')),
-                        UNIQUE(key, user_id)
-                    )
-                ''')
+                if 'user_id' not in settings_columns or 'id' not in settings_columns:
+                    logger.warning("Upgrading settings table...")
+                    conn.executescript('''
+                        BEGIN;
+                        ALTER TABLE settings RENAME TO settings_old;
+                        CREATE TABLE settings (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            key TEXT NOT NULL,
+                            value TEXT,
+                            user_id INTEGER,
+                            created_at TEXT DEFAULT (datetime('now')),
+                            updated_at TEXT DEFAULT (datetime('now')),
+                            UNIQUE(key, user_id)
+                        );
+                        INSERT OR IGNORE INTO settings (key, value)
+                        SELECT key, value FROM settings_old;
+                        DROP TABLE settings_old;
+                        COMMIT;
+                    ''')
+                    logger.info("settings table upgraded")
+            
+            # Version 5: vehicles becomes WITHOUT ROWID
+            if current < 5:
+                # Check vehicles table - rows should live directly in the vin btree
+                cursor.execute(
+                    "SELECT COUNT(*) FROM sqlite_master "
+                    "WHERE name='vehicles' AND sql NOT LIKE '%WITHOUT ROWID%'"
+                )
+                if cursor.fetchone()[0]:
+                    logger.warning("Upgrading vehicles table to WITHOUT ROWID...")
+                    cursor.execute("PRAGMA table_info(vehicles)")
+                    vehicle_columns = [col[1] for col in cursor.fetchall()]
+                    new_columns = [
+                        'vin', 'year', 'make', 'model', 'trim', 'engine_type', 'color',
+                        'purchase_date', 'purchase_price', 'current_mileage', 'user_id',
+                        'created_at', 'updated_at',
+                    ]
+                    copied = ", ".join(c for c in new_columns if c in vehicle_columns)
                 
-                # Restore settings
-                for key, value in old_settings:
-                    cursor.execute(
-                        "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
-                        (key, value)
-                    )
-                conn.commit()
-                logger.info("settings table upgraded")
+                    # Foreign keys must be off or dropping the old table would
+                    # cascade into every table that references vehicles(vin)
+                    conn.execute("PRAGMA foreign_keys = OFF")
+                    try:
+                        conn.execute("BEGIN")
+                        conn.execute('''
+                            CREATE TABLE vehicles_new (
+                                vin TEXT PRIMARY KEY,
+                                year INTEGER NOT NULL,
+                                make TEXT NOT NULL,
+                                model TEXT NOT NULL,
+                                trim TEXT,
+                                engine_type TEXT,
+                                color TEXT,
+                                purchase_date TEXT,
+                                purchase_price REAL,
+                                current_mileage INTEGER DEFAULT 0,
+                                user_id INTEGER,
+                                created_at TEXT DEFAULT (datetime('now')),
+                                updated_at TEXT DEFAULT (datetime('now')),
+                                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
+                            ) WITHOUT ROWID
+                        ''')
+                        conn.execute(
+                            f"INSERT INTO vehicles_new ({copied}) SELECT {copied} FROM vehicles"
+                        )
+                        conn.execute("DROP TABLE vehicles")
+                        conn.execute("ALTER TABLE vehicles_new RENAME TO vehicles")
+                        # Owners deleted while the constraint was missing
+                        # get what ON DELETE SET NULL would have done
+                        conn.execute('''
+                            UPDATE vehicles SET user_id = NULL
+                            WHERE user_id IS NOT NULL
+                                AND user_id NOT IN (SELECT id FROM users)
+                        ''')
+                        violations = conn.execute("PRAGMA foreign_key_check(vehicles)").fetchall()
+                        if violations:
+                            raise sqlite3.IntegrityError(
+                                f"vehicles rebuild left {len(violations)} foreign key violations"
+                            )
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+                    finally:
+                        conn.execute("PRAGMA foreign_keys = ON")
+                    logger.info("vehicles table upgraded")
+            
+            # Version 6: (vin, updated_at) indexes for the analytics cache's
+            # freshness probe; created with the rest of _INDEXES below
+            
+            # Version 7: (date, id) keyset-pagination indexes for repairs
+            # and trips, also created from _INDEXES
+            
+            # Version 8: covering (vin, cost) indexes for the all-vehicles
+            # summary's per-vehicle totals, also created from _INDEXES
+            
+            # Version 9: covering full-tank index for the MPG queries, also
+            # created from _INDEXES
+            
+            # Version 10: trigger-maintained monthly_totals, filled from the
+            # existing repairs and fuel logs
+            if current < 10:
+                logger.warning("Building monthly_totals...")
+                conn.executescript(
+                    'BEGIN;' + MONTHLY_TOTALS_SCHEMA + MONTHLY_TOTALS_BACKFILL + 'COMMIT;'
+                )
+                logger.info("monthly_totals built")
+            
+            # Older databases were created without indexes, and the
+            # upgrades above drop them along with the table
+            conn.executescript(_INDEXES)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("PRAGMA optimize")
+            _invalidate_schema_cache()
             
         finally:
             conn.close()
     return True
 
 
+# Indexes for the per-vehicle lookups every service runs (WHERE vin = ?
+# ORDER BY date DESC), keyset pages ordered by (date, id) DESC, and the
+# analytics freshness probe (MAX(updated_at)), and the per-vehicle cost
+# totals (GROUP BY vin), and the MPG queries' latest full-tank fill-ups.
+# Names match db/schema.py.
+_INDEXES = '''
+    CREATE INDEX IF NOT EXISTS idx_repairs_vin_date ON repairs(vin, date DESC);
+    CREATE INDEX IF NOT EXISTS idx_fuel_logs_vin_date ON fuel_logs(vin, date DESC);
+    CREATE INDEX IF NOT EXISTS idx_maintenance_vin ON maintenance_intervals(vin);
+    CREATE INDEX IF NOT EXISTS idx_mileage_vin_date ON mileage_history(vin, date DESC);
+    CREATE INDEX IF NOT EXISTS idx_trips_vin_date ON trips(vin, date DESC);
+    CREATE INDEX IF NOT EXISTS idx_repairs_vin_updated ON repairs(vin, updated_at);
+    CREATE INDEX IF NOT EXISTS idx_fuel_logs_vin_updated ON fuel_logs(vin, updated_at);
+    CREATE INDEX IF NOT EXISTS idx_trips_vin_updated ON trips(vin, updated_at);
+    CREATE INDEX IF NOT EXISTS idx_repairs_vin_date_id ON repairs(vin, date, id);
+    CREATE INDEX IF NOT EXISTS idx_repairs_date_id ON repairs(date, id);
+    CREATE INDEX IF NOT EXISTS idx_trips_vin_date_id ON trips(vin, date, id);
+    CREATE INDEX IF NOT EXISTS idx_trips_date_id ON trips(date, id);
+    CREATE INDEX IF NOT EXISTS idx_repairs_vin_cost ON repairs(vin, cost);
+    CREATE INDEX IF NOT EXISTS idx_fuel_logs_vin_cost ON fuel_logs(vin, total_cost);
+    CREATE INDEX IF NOT EXISTS idx_fuel_logs_vin_mpg ON fuel_logs(vin, full_tank, odometer DESC, gallons);
+'''
+
+
 def _create_tables_inline():
     """Create all required tables inline (no import dependencies)."""
     schema = '''
@@ -401,8 +892,9 @@ def _create_tables_inline():
         current_mileage INTEGER DEFAULT 0,
         user_id INTEGER,
         created_at TEXT DEFAULT (datetime('now')),
-        updated_at TEXT DEFAULT (datetime('now'))
-    );
+        updated_at TEXT DEFAULT (datetime('now')),
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
+    ) WITHOUT ROWID;
     
     CREATE TABLE IF NOT EXISTS repairs (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -489,8 +981,10 @@ def _create_tables_inline():
     
     conn = get_connection()
     try:
-        conn.executescript(schema)
+        conn.executescript(schema + MONTHLY_TOTALS_SCHEMA + _INDEXES)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
+        _invalidate_schema_cache()
         logger.info("All tables created successfully")
         
         # Skip auto-seeding for fresh user experience
@@ -498,7 +992,7 @@ def _create_tables_inline():
         # _seed_sample_data(conn)
         
     except Exception as e:
-        logger.error(f"Error creating tables: {e}")
+        logger.error("Error creating tables: %s", e)
         raise
     finally:
         conn.close()
@@ -512,6 +1006,8 @@ def _seed_sample_data(conn):
     if cursor.fetchone()[0] > 0:
         return
     
+    cursor.execute("BEGIN")
+    
     # Sample vehicles
     vehicles = [
         ('1HGCM82633A004352', 2020, 'Honda', 'Civic', 'EX', 'Gas', 'Silver', 45000),
@@ -526,11 +1022,10 @@ def _seed_sample_data(conn):
         ('5YFBURHE5HP123456', 2019, 'Toyota', 'Corolla', 'SE', 'Gas', 'Blue', 55000),
     ]
     
-    for v in vehicles:
-        cursor.execute('''
-            INSERT OR IGNORE INTO vehicles (vin, year, make, model, trim, engine_type, color, current_mileage)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', v)
+    cursor.executemany('''
+        INSERT OR IGNORE INTO vehicles (vin, year, make, model, trim, engine_type, color, current_mileage)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', vehicles)
     
     # Sample maintenance intervals for vehicles
     # (vin, service_type, interval_miles, interval_months, last_mileage, last_date, next_due_mileage)
@@ -549,12 +1044,11 @@ def _seed_sample_data(conn):
         ('5YFBURHE5HP123456', 'Oil Change', 5000, 6, 52000, '2024-08-01', 57000),
     ]
     
-    for m in maintenance:
-        cursor.execute('''
-            INSERT OR IGNORE INTO maintenance_intervals 
-            (vin, service_type, interval_miles, interval_months, last_performed_mileage, last_performed_date, next_due_mileage)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', m)
+    cursor.executemany('''
+        INSERT OR IGNORE INTO maintenance_intervals 
+        (vin, service_type, interval_miles, interval_months, last_performed_mileage, last_performed_date, next_due_mileage)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', maintenance)
     
     # Sample repairs
     repairs = [
@@ -565,11 +1059,11 @@ def _seed_sample_data(conn):
         ('1F1J7J2033A123456', 'Battery Replacement', 185.00, 55000, '2024-04-15'),
     ]
     
-    for r in repairs:
-        cursor.execute('''
-            INSERT OR IGNORE INTO repairs (vin, service, cost, mileage, date)
-            VALUES (?, ?, ?, ?, ?)
-        ''', r)
+    cursor.executemany('''
+        INSERT OR IGNORE INTO repairs (vin, service, cost, mileage, date)
+        VALUES (?, ?, ?, ?, ?)
+    ''', repairs)
     
+    # All three batches share one transaction, so this is the only commit
     conn.commit()
     logger.info("Sample data seeded successfully")
@@ -7,22 +7,96 @@ Run this script to initialize or reset the database.
 
 import sqlite3
 import os
-import shutil
+import sys
 from datetime import datetime, timedelta
 
-from schema import SCHEMA, CURRENT_VERSION, DEFAULT_MAINTENANCE_INTERVALS, TABLES
+# Run as a script from db/, so the backend directory has to be on the path
+# for the package import; db_helper owns the PRAGMA user_version number
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db.db_helper import SCHEMA_VERSION
+
+from schema import (
+    SCHEMA_TABLES,
+    SCHEMA_INDEXES,
+    CURRENT_VERSION,
+    DEFAULT_MAINTENANCE_INTERVALS,
+    TABLES,
+)
 
 # Database paths
 DB_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(DB_DIR, "carlog.db")
 BACKUP_PATH = os.path.join(DB_DIR, "carlog_backup.db")
 
+# Seed/migration statements. Reusing the same string objects keeps every
+# batch on one entry of the connection's prepared-statement cache.
+INSERT_VEHICLE_SQL = """
+    INSERT INTO vehicles (vin, year, make, model, trim, engine_type, color, current_mileage, user_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+# Prefix for insert_multirow(); the VALUES groups are appended per chunk
+INSERT_MAINT_SQL = """
+    INSERT INTO maintenance_intervals 
+    (vin, service_type, interval_miles, interval_months, next_due_mileage)
+    VALUES
+"""
+INSERT_REPAIR_SQL = """
+    INSERT INTO repairs (vin, service, description, cost, mileage, date, shop_name)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_FUEL_SQL = """
+    INSERT INTO fuel_logs (vin, gallons, price_per_gallon, total_cost, odometer, date, station, fuel_type)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_TRIP_SQL = """
+    INSERT INTO trips (vin, start_location, end_location, start_mileage, end_mileage, distance, date, purpose, is_business)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_MILEAGE_SQL = """
+    INSERT INTO mileage_history (vin, mileage, date, source)
+    VALUES (?, ?, ?, 'manual')
+"""
+# Prefix for insert_multirow()
+INSERT_SETTINGS_SQL = """
+    INSERT OR IGNORE INTO settings (key, value, user_id)
+    VALUES
+"""
 
-def get_connection():
-    """Get a database connection with row factory."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+# Legacy-schema migration
+INSERT_LEGACY_VEHICLE_SQL = """
+    INSERT INTO vehicles (vin, year, make, model, engine_type, trim, user_id, current_mileage)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+"""
+INSERT_LEGACY_MAINT_SQL = """
+    INSERT INTO maintenance_intervals 
+    (vin, service_type, interval_miles, interval_months)
+    VALUES (?, ?, ?, ?)
+"""
+INSERT_LEGACY_REPAIR_SQL = """
+    INSERT INTO repairs (id, vin, service, cost, date)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def get_connection(fast=False, path=None):
+    """
+    Get a database connection with row factory and WAL/tuning PRAGMAs.
+    
+    With fast=True rows come back as plain tuples instead of sqlite3.Row;
+    the init/migration path only reads columns by position. path defaults
+    to DB_PATH.
+    """
+    conn = sqlite3.connect(path or DB_PATH, cached_statements=256)
+    if not fast:
+        conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        PRAGMA journal_mode = WAL;
+        PRAGMA synchronous = NORMAL;
+        PRAGMA temp_store = MEMORY;
+        PRAGMA cache_size = -64000;
+        PRAGMA mmap_size = 268435456;
+        PRAGMA foreign_keys = ON;
+    """)
     return conn
 
 
@@ -32,12 +106,60 @@ def backup_database():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_name = f"carlog_backup_{timestamp}.db"
         backup_path = os.path.join(DB_DIR, backup_name)
-        shutil.copy2(DB_PATH, backup_path)
+        # VACUUM INTO writes a compacted, consistent copy (including any
+        # changes still sitting in the WAL) rather than the raw file bytes
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            conn.execute("VACUUM INTO ?", (backup_path,))
+        finally:
+            conn.close()
         print(f"✓ Backed up database to: {backup_name}")
         return backup_path
     return None
 
 
+def remove_database():
+    """Delete the database file along with its WAL and shared-memory files."""
+    for suffix in ("", "-wal", "-shm"):
+        path = DB_PATH + suffix
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def write_to_disk(conn):
+    """Copy an in-memory database built by init_database() to DB_PATH."""
+    disk = sqlite3.connect(DB_PATH)
+    try:
+        conn.backup(disk)
+        disk.execute("PRAGMA journal_mode = WAL")
+    finally:
+        disk.close()
+
+
+def insert_multirow(cursor, insert_sql, rows, chunk_size=500):
+    """
+    Insert rows using multi-row VALUES statements.
+    
+    insert_sql is the statement up to and including VALUES, e.g.
+    "INSERT INTO t (a, b) VALUES". Full chunks share one prepared
+    statement with chunk_size row groups; the remainder gets one more.
+    """
+    if not rows:
+        return
+    group = "(" + ", ".join(["?"] * len(rows[0])) + ")"
+    full_sql = f"{insert_sql} {', '.join([group] * chunk_size)}"
+    
+    full = len(rows) - len(rows) % chunk_size
+    for start in range(0, full, chunk_size):
+        chunk = rows[start:start + chunk_size]
+        cursor.execute(full_sql, [value for row in chunk for value in row])
+    
+    tail = rows[full:]
+    if tail:
+        tail_sql = f"{insert_sql} {', '.join([group] * len(tail))}"
+        cursor.execute(tail_sql, [value for row in tail for value in row])
+
+
 def get_schema_version(conn):
     """Get the current schema version from database."""
     try:
@@ -87,8 +209,8 @@ def migrate_old_data(conn):
     cursor.execute("DROP TABLE IF EXISTS repairs")
     cursor.execute("DROP TABLE IF EXISTS vehicles")
     
-    # Create new schema
-    cursor.executescript(SCHEMA)
+    # Create new tables; indexes are built after the rows are copied
+    cursor.executescript(SCHEMA_TABLES)
     
     # Create default user
     cursor.execute("""
@@ -97,36 +219,28 @@ def migrate_old_data(conn):
     user_id = cursor.lastrowid
     
     # Migrate vehicles
-    for v in old_vehicles:
-        vin = v[0]
-        cursor.execute("""
-            INSERT INTO vehicles (vin, year, make, model, engine_type, trim, user_id, current_mileage)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 0)
-        """, (vin, v[1], v[2], v[3], v[4], v[5], user_id))
-        
-        # Create maintenance intervals from old data
-        maintenance_data = [
-            ('Oil Change', v[6]),
-            ('Transmission Fluid', v[7]),
-            ('Brake Inspection', v[8]),
-            ('Air Filter', v[9])
-        ]
-        
-        for service_type, interval_miles in maintenance_data:
-            if interval_miles:
-                cursor.execute("""
-                    INSERT INTO maintenance_intervals 
-                    (vin, service_type, interval_miles, interval_months)
-                    VALUES (?, ?, ?, ?)
-                """, (vin, service_type, interval_miles, 
-                      DEFAULT_MAINTENANCE_INTERVALS.get(service_type, {}).get('months', 12)))
+    cursor.executemany(
+        INSERT_LEGACY_VEHICLE_SQL,
+        ((v[0], v[1], v[2], v[3], v[4], v[5], user_id) for v in old_vehicles)
+    )
+    
+    # Create maintenance intervals from the old per-vehicle interval columns
+    legacy_services = ('Oil Change', 'Transmission Fluid', 'Brake Inspection', 'Air Filter')
+    cursor.executemany(
+        INSERT_LEGACY_MAINT_SQL,
+        (
+            (v[0], service_type, interval_miles,
+             DEFAULT_MAINTENANCE_INTERVALS.get(service_type, {}).get('months', 12))
+            for v in old_vehicles
+            for service_type, interval_miles in zip(legacy_services, v[6:10])
+            if interval_miles
+        )
+    )
     
     # Migrate repairs
-    for r in old_repairs:
-        cursor.execute("""
-            INSERT INTO repairs (id, vin, service, cost, date)
-            VALUES (?, ?, ?, ?, ?)
-        """, (r[0], r[1], r[2], r[3], r[4]))
+    cursor.executemany(
+        INSERT_LEGACY_REPAIR_SQL, ((r[0], r[1], r[2], r[3], r[4]) for r in old_repairs)
+    )
     
     # Record schema version
     cursor.execute("""
@@ -135,14 +249,19 @@ def migrate_old_data(conn):
     """, (CURRENT_VERSION,))
     
     conn.commit()
+    create_indexes(conn)
     print(f"  → Migrated {len(old_vehicles)} vehicles and {len(old_repairs)} repairs")
     return True
 
 
 def create_tables(conn):
-    """Create all tables from schema."""
+    """Create all tables from schema (indexes come later, see create_indexes)."""
     cursor = conn.cursor()
-    cursor.executescript(SCHEMA)
+    cursor.executescript(SCHEMA_TABLES)
+    
+    # executescript() commits on its own, so the transaction the rest of
+    # init_database shares starts here
+    cursor.execute("BEGIN IMMEDIATE")
     
     # Record schema version if not exists
     version = get_schema_version(conn)
@@ -151,8 +270,11 @@ def create_tables(conn):
             INSERT INTO schema_version (version, description)
             VALUES (?, 'Initial schema creation')
         """, (CURRENT_VERSION,))
-    
-    conn.commit()
+
+
+def create_indexes(conn):
+    """Create all indexes. Run after bulk inserts so each index is built once."""
+    conn.executescript(SCHEMA_INDEXES)
 
 
 def seed_default_user(conn):
@@ -164,7 +286,6 @@ def seed_default_user(conn):
             INSERT INTO users (name, email) 
             VALUES ('Default User', 'user@carlog.local')
         """)
-        conn.commit()
         print("  → Created default user")
         return cursor.lastrowid
     return None
@@ -195,25 +316,41 @@ def seed_sample_vehicles(conn):
         ('1F1J7J2033A123457', 2022, 'Ford', 'F-150', 'XLT', 'V6 EcoBoost', 'White', 48000),
     ]
     
-    for vin, year, make, model, trim, engine, color, mileage in sample_vehicles:
-        cursor.execute("""
-            INSERT INTO vehicles (vin, year, make, model, trim, engine_type, color, current_mileage, user_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (vin, year, make, model, trim, engine, color, mileage, user_id))
-        
-        # Add default maintenance intervals
-        for service_type, intervals in DEFAULT_MAINTENANCE_INTERVALS.items():
-            cursor.execute("""
-                INSERT INTO maintenance_intervals 
-                (vin, service_type, interval_miles, interval_months, next_due_mileage)
-                VALUES (?, ?, ?, ?, ?)
-            """, (vin, service_type, intervals['miles'], intervals['months'], 
-                  mileage + intervals['miles']))
+    vehicle_rows = [
+        (vin, year, make, model, trim, engine, color, mileage, user_id)
+        for vin, year, make, model, trim, engine, color, mileage in sample_vehicles
+    ]
+    
+    # Default maintenance intervals for every vehicle
+    intervals_list = list(DEFAULT_MAINTENANCE_INTERVALS.items())
+    interval_rows = [
+        (vin, service_type, intervals['miles'], intervals['months'],
+         mileage + intervals['miles'])
+        for vin, _, _, _, _, _, _, mileage in sample_vehicles
+        for service_type, intervals in intervals_list
+    ]
+    
+    cursor.executemany(INSERT_VEHICLE_SQL, vehicle_rows)
+    
+    insert_multirow(cursor, INSERT_MAINT_SQL, interval_rows)
     
-    conn.commit()
     print(f"  → Seeded {len(sample_vehicles)} sample vehicles with maintenance intervals")
 
 
+def _mileage_history_rows(vins, current_mileages, today):
+    """Yield six monthly readings per vehicle, ending at its current mileage."""
+    # The reading dates are the same for every vehicle, so format them once
+    start = today.date()
+    dates = [(start - timedelta(days=30 * (5-i))).isoformat() for i in range(6)]
+    
+    for vin in vins:
+        current = current_mileages[vin] or 30000
+        
+        for i, date in enumerate(dates):
+            mileage = current - (5-i) * 800  # ~800 miles per month
+            yield (vin, max(0, mileage), date)
+
+
 def seed_sample_data(conn):
     """Seed sample repairs, fuel logs, and trips."""
     cursor = conn.cursor()
@@ -223,9 +360,10 @@ def seed_sample_data(conn):
     if cursor.fetchone()[0] > 5:
         return  # Already has enough data
     
-    # Get a vehicle
-    cursor.execute("SELECT vin FROM vehicles LIMIT 3")
-    vehicles = [row[0] for row in cursor.fetchall()]
+    # Get a few vehicles, with their mileage for the history rows below
+    cursor.execute("SELECT vin, current_mileage FROM vehicles LIMIT 3")
+    current_mileages = {row[0]: row[1] for row in cursor.fetchall()}
+    vehicles = list(current_mileages)
     
     if not vehicles:
         return
@@ -245,11 +383,7 @@ def seed_sample_data(conn):
             (vehicles[1], 'Air Filter', 'Engine air filter replacement', 35.00, 31000, (today - timedelta(days=30)).strftime('%Y-%m-%d'), 'AutoZone'),
         ])
     
-    for repair in repairs:
-        cursor.execute("""
-            INSERT INTO repairs (vin, service, description, cost, mileage, date, shop_name)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, repair)
+    cursor.executemany(INSERT_REPAIR_SQL, repairs)
     
     # Sample fuel logs
     fuel_logs = [
@@ -264,11 +398,7 @@ def seed_sample_data(conn):
             (vehicles[1], 11.0, 3.55, 39.05, 31850, (today - timedelta(days=3)).strftime('%Y-%m-%d'), 'Shell', 'Regular'),
         ])
     
-    for fuel in fuel_logs:
-        cursor.execute("""
-            INSERT INTO fuel_logs (vin, gallons, price_per_gallon, total_cost, odometer, date, station, fuel_type)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, fuel)
+    cursor.executemany(INSERT_FUEL_SQL, fuel_logs)
     
     # Sample trips
     trips = [
@@ -277,24 +407,12 @@ def seed_sample_data(conn):
         (vehicles[0], 'Home', 'Client Meeting', 44600, 44680, 80, (today - timedelta(days=3)).strftime('%Y-%m-%d'), 'Business', 1),
     ]
     
-    for trip in trips:
-        cursor.execute("""
-            INSERT INTO trips (vin, start_location, end_location, start_mileage, end_mileage, distance, date, purpose, is_business)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, trip)
+    cursor.executemany(INSERT_TRIP_SQL, trips)
     
     # Sample mileage history
-    for vin in vehicles[:2]:
-        cursor.execute("SELECT current_mileage FROM vehicles WHERE vin = ?", (vin,))
-        current = cursor.fetchone()[0] or 30000
-        
-        for i in range(6):
-            date = (today - timedelta(days=30 * (5-i))).strftime('%Y-%m-%d')
-            mileage = current - (5-i) * 800  # ~800 miles per month
-            cursor.execute("""
-                INSERT INTO mileage_history (vin, mileage, date, source)
-                VALUES (?, ?, ?, 'manual')
-            """, (vin, max(0, mileage), date))
+    cursor.executemany(
+        INSERT_MILEAGE_SQL, _mileage_history_rows(vehicles[:2], current_mileages, today)
+    )
     
     # Default settings
     settings = [
@@ -305,13 +423,8 @@ def seed_sample_data(conn):
         ('notifications_enabled', 'true', None),
     ]
     
-    for key, value, user_id in settings:
-        cursor.execute("""
-            INSERT OR IGNORE INTO settings (key, value, user_id)
-            VALUES (?, ?, ?)
-        """, (key, value, user_id))
+    insert_multirow(cursor, INSERT_SETTINGS_SQL, settings)
     
-    conn.commit()
     print(f"  → Seeded sample repairs, fuel logs, trips, and mileage history")
 
 
@@ -326,13 +439,16 @@ def verify_tables(conn):
         print(f"  ⚠ Missing tables: {missing}")
         return False
     
-    # Print table counts
+    # Print table counts, gathered in a single statement
+    present = [table for table in TABLES if table in existing_tables]
+    count_sql = " UNION ALL ".join(
+        f"SELECT '{table}', (SELECT COUNT(*) FROM {table})" for table in present
+    )
+    counts = dict(cursor.execute(count_sql).fetchall()) if present else {}
+    
     print("\n  Table Statistics:")
-    for table in TABLES:
-        if table in existing_tables:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            count = cursor.fetchone()[0]
-            print(f"    • {table}: {count} rows")
+    for table in present:
+        print(f"    • {table}: {counts[table]} rows")
     
     return True
 
@@ -351,17 +467,30 @@ def init_database(force_reset=False, seed_data=True):
     
     if force_reset and os.path.exists(DB_PATH):
         backup_database()
-        os.remove(DB_PATH)
+        remove_database()
         print("✓ Removed old database")
     
-    conn = get_connection()
+    # A reset builds the new database in memory and writes it out once at
+    # the end, instead of paying for journal writes on the final file
+    conn = get_connection(fast=True, path=":memory:" if force_reset else None)
+    # Nothing else uses the file while it is being built; skip fsyncs
+    # entirely and restore normal durability before handing it back
+    conn.execute("PRAGMA synchronous = OFF")
     
     try:
+        # Tables built here carry the full current schema. A file that
+        # already had them keeps its user_version so ensure_initialized
+        # still runs whatever migration steps it is missing.
+        fresh = not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='vehicles'"
+        ).fetchone()
+        
         # Check for migration from old schema
         if not force_reset:
             migrated = migrate_old_data(conn)
             if migrated:
                 print("✓ Migrated from legacy schema")
+                fresh = True
         
         # Create tables
         print("\n→ Creating tables...")
@@ -376,6 +505,16 @@ def init_database(force_reset=False, seed_data=True):
             seed_sample_data(conn)
             print("✓ Data seeded")
         
+        if fresh:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        
+        # Schema version and all seed data land in a single commit
+        conn.commit()
+        
+        print("\n→ Creating indexes...")
+        create_indexes(conn)
+        print("✓ Indexes created")
+        
         # Verify
         print("\n→ Verifying database...")
         if verify_tables(conn):
@@ -383,12 +522,19 @@ def init_database(force_reset=False, seed_data=True):
         else:
             print("\n⚠ Database initialization completed with warnings")
         
+        if force_reset:
+            write_to_disk(conn)
+        
         # Get schema version
         version = get_schema_version(conn)
         print(f"\n  Schema Version: {version}")
         print(f"  Database Path: {DB_PATH}")
         
+    except Exception:
+        conn.rollback()
+        raise
     finally:
+        conn.execute("PRAGMA synchronous = NORMAL")
         conn.close()
     
     print("\n" + "=" * 50 + "\n")
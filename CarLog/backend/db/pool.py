@@ -0,0 +1,133 @@
+"""
+CarLog Connection Pool
+======================
+Bounded pool of long-lived SQLite connections shared by every request in
+the process, plus the lock that lines up the process's writers.
+"""
+
+import queue
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the pool's timeout."""
+
+
+class ConnectionPool:
+    """
+    Keeps up to `size` idle connections open between requests, so their
+    page and statement caches stay warm, and allows `max_overflow` more
+    under bursts. Overflow connections are closed when handed back. Once
+    size + max_overflow connections are checked out, acquire() waits.
+    """
+    
+    def __init__(
+        self,
+        connect: Callable[[], sqlite3.Connection],
+        size: int = 10,
+        max_overflow: int = 20,
+        timeout: float = 30.0
+    ):
+        self._connect = connect
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size + max_overflow)
+        self._open: List[sqlite3.Connection] = []
+        self._open_lock = threading.Lock()
+        self.timeout = timeout
+    
+    def acquire(self) -> sqlite3.Connection:
+        """Check out an idle connection, opening one if none is idle."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout("Timed out waiting for a database connection")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            conn = self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._open_lock:
+            self._open.append(conn)
+        return conn
+    
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection, rolling back anything it left open."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._close(conn)
+        except sqlite3.Error:
+            # Unusable after a failed rollback; don't hand it out again
+            self._close(conn)
+        finally:
+            self._slots.release()
+    
+    @contextmanager
+    def get_conn(self):
+        """
+        Borrow a connection for the duration of a block.
+        
+        Usage:
+            with pool.get_conn() as conn:
+                conn.execute("SELECT ...")
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+    
+    def close_all(self) -> None:
+        """Close every connection the pool opened, idle or not."""
+        with self._open_lock:
+            conns, self._open = self._open, []
+        for conn in conns:
+            self._optimize_and_close(conn)
+    
+    def _close(self, conn: sqlite3.Connection) -> None:
+        with self._open_lock:
+            try:
+                self._open.remove(conn)
+            except ValueError:
+                pass
+        self._optimize_and_close(conn)
+    
+    @staticmethod
+    def _optimize_and_close(conn: sqlite3.Connection) -> None:
+        try:
+            # Let SQLite refresh planner stats for the queries this
+            # connection ran before it goes away
+            conn.execute("PRAGMA optimize")
+            conn.close()
+        except sqlite3.Error as e:
+            logger.debug("Error closing pooled connection: %s", e)
+
+
+class WriteLock:
+    """
+    SQLite allows one writer at a time. Writers from this process queue on
+    a lock (a cooperative one under gevent's monkey-patching) instead of
+    spinning in SQLite's busy handler, which blocks the whole worker.
+    Writers in other processes are still arbitrated by busy_timeout.
+    """
+    
+    def __init__(self, timeout: float = 5.0):
+        self._lock = threading.Lock()
+        self.timeout = timeout
+    
+    def acquire(self) -> bool:
+        """Wait for the lock; False if it timed out (SQLite then decides)."""
+        return self._lock.acquire(timeout=self.timeout)
+    
+    def release(self) -> None:
+        self._lock.release()
@@ -6,7 +6,7 @@ Production-ready with proper relationships, indexes, and constraints.
 """
 
 # SQL statements for creating all tables
-SCHEMA = """
+SCHEMA_TABLES = """
 -- ============================================
 -- USERS TABLE
 -- Local user management for multi-user support
@@ -19,8 +19,6 @@ CREATE TABLE IF NOT EXISTS users (
     updated_at TEXT DEFAULT (datetime('now'))
 );
 
-CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
-
 -- ============================================
 -- VEHICLES TABLE
 -- Core vehicle information
@@ -40,10 +38,7 @@ CREATE TABLE IF NOT EXISTS vehicles (
     created_at TEXT DEFAULT (datetime('now')),
     updated_at TEXT DEFAULT (datetime('now')),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
-);
-
-CREATE INDEX IF NOT EXISTS idx_vehicles_user ON vehicles(user_id);
-CREATE INDEX IF NOT EXISTS idx_vehicles_make_model ON vehicles(make, model);
+) WITHOUT ROWID;
 
 -- ============================================
 -- REPAIRS TABLE
@@ -64,10 +59,6 @@ CREATE TABLE IF NOT EXISTS repairs (
     FOREIGN KEY (vin) REFERENCES vehicles(vin) ON DELETE CASCADE
 );
 
-CREATE INDEX IF NOT EXISTS idx_repairs_vin ON repairs(vin);
-CREATE INDEX IF NOT EXISTS idx_repairs_date ON repairs(date DESC);
-CREATE INDEX IF NOT EXISTS idx_repairs_vin_date ON repairs(vin, date DESC);
-
 -- ============================================
 -- FUEL_LOGS TABLE
 -- Track fuel purchases and calculate MPG
@@ -89,10 +80,6 @@ CREATE TABLE IF NOT EXISTS fuel_logs (
     FOREIGN KEY (vin) REFERENCES vehicles(vin) ON DELETE CASCADE
 );
 
-CREATE INDEX IF NOT EXISTS idx_fuel_logs_vin ON fuel_logs(vin);
-CREATE INDEX IF NOT EXISTS idx_fuel_logs_date ON fuel_logs(date DESC);
-CREATE INDEX IF NOT EXISTS idx_fuel_logs_vin_date ON fuel_logs(vin, date DESC);
-
 -- ============================================
 -- MAINTENANCE_INTERVALS TABLE
 -- Recommended maintenance schedules per vehicle
@@ -115,9 +102,6 @@ CREATE TABLE IF NOT EXISTS maintenance_intervals (
     UNIQUE(vin, service_type)
 );
 
-CREATE INDEX IF NOT EXISTS idx_maintenance_vin ON maintenance_intervals(vin);
-CREATE INDEX IF NOT EXISTS idx_maintenance_next_due ON maintenance_intervals(next_due_mileage);
-
 -- ============================================
 -- MILEAGE_HISTORY TABLE
 -- Track odometer readings over time
@@ -133,10 +117,6 @@ CREATE TABLE IF NOT EXISTS mileage_history (
     FOREIGN KEY (vin) REFERENCES vehicles(vin) ON DELETE CASCADE
 );
 
-CREATE INDEX IF NOT EXISTS idx_mileage_vin ON mileage_history(vin);
-CREATE INDEX IF NOT EXISTS idx_mileage_date ON mileage_history(date DESC);
-CREATE INDEX IF NOT EXISTS idx_mileage_vin_date ON mileage_history(vin, date DESC);
-
 -- ============================================
 -- TRIPS TABLE
 -- Track individual trips for mileage logging
@@ -158,10 +138,6 @@ CREATE TABLE IF NOT EXISTS trips (
     FOREIGN KEY (vin) REFERENCES vehicles(vin) ON DELETE CASCADE
 );
 
-CREATE INDEX IF NOT EXISTS idx_trips_vin ON trips(vin);
-CREATE INDEX IF NOT EXISTS idx_trips_date ON trips(date DESC);
-CREATE INDEX IF NOT EXISTS idx_trips_business ON trips(is_business);
-
 -- ============================================
 -- SETTINGS TABLE
 -- User and app settings (key-value store)
@@ -177,9 +153,6 @@ CREATE TABLE IF NOT EXISTS settings (
     UNIQUE(key, user_id)
 );
 
-CREATE INDEX IF NOT EXISTS idx_settings_key ON settings(key);
-CREATE INDEX IF NOT EXISTS idx_settings_user ON settings(user_id);
-
 -- ============================================
 -- SCHEMA VERSION TABLE
 -- Track database migrations
@@ -191,6 +164,127 @@ CREATE TABLE IF NOT EXISTS schema_version (
 );
 """
 
+# Trigger set that keeps one source table's share of monthly_totals current;
+# an update is handled as removing the old row and adding the new one
+_MONTHLY_TOTALS_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS trg_{table}_monthly_insert AFTER INSERT ON {table}
+BEGIN
+    INSERT INTO monthly_totals (vin, month, {kind}_cost, {kind}_count)
+    SELECT NEW.vin, strftime('%Y-%m', NEW.date), COALESCE(NEW.{cost}, 0), 1
+    WHERE strftime('%Y-%m', NEW.date) IS NOT NULL
+    ON CONFLICT (vin, month) DO UPDATE SET
+        {kind}_cost = {kind}_cost + excluded.{kind}_cost,
+        {kind}_count = {kind}_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_{table}_monthly_delete AFTER DELETE ON {table}
+BEGIN
+    UPDATE monthly_totals SET
+        {kind}_cost = CASE WHEN {kind}_count > 1 THEN {kind}_cost - COALESCE(OLD.{cost}, 0) ELSE 0 END,
+        {kind}_count = {kind}_count - 1
+    WHERE vin = OLD.vin AND month = strftime('%Y-%m', OLD.date);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_{table}_monthly_update AFTER UPDATE OF vin, date, {cost} ON {table}
+BEGIN
+    UPDATE monthly_totals SET
+        {kind}_cost = CASE WHEN {kind}_count > 1 THEN {kind}_cost - COALESCE(OLD.{cost}, 0) ELSE 0 END,
+        {kind}_count = {kind}_count - 1
+    WHERE vin = OLD.vin AND month = strftime('%Y-%m', OLD.date);
+    
+    INSERT INTO monthly_totals (vin, month, {kind}_cost, {kind}_count)
+    SELECT NEW.vin, strftime('%Y-%m', NEW.date), COALESCE(NEW.{cost}, 0), 1
+    WHERE strftime('%Y-%m', NEW.date) IS NOT NULL
+    ON CONFLICT (vin, month) DO UPDATE SET
+        {kind}_cost = {kind}_cost + excluded.{kind}_cost,
+        {kind}_count = {kind}_count + 1;
+END;
+"""
+
+# ============================================
+# MONTHLY TOTALS TABLE
+# Per-vehicle repair and fuel spending by month ('YYYY-MM'), maintained by
+# triggers so the monthly spending report reads a handful of rows instead
+# of aggregating every repair and fill-up. The counts tell a month whose
+# entries were all removed (cost reset to 0) from one that cost nothing.
+# ============================================
+MONTHLY_TOTALS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS monthly_totals (
+    vin TEXT NOT NULL,
+    month TEXT NOT NULL,
+    repair_cost REAL NOT NULL DEFAULT 0,
+    repair_count INTEGER NOT NULL DEFAULT 0,
+    fuel_cost REAL NOT NULL DEFAULT 0,
+    fuel_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (vin, month)
+) WITHOUT ROWID;
+""" + _MONTHLY_TOTALS_TRIGGERS.format(
+    table='repairs', cost='cost', kind='repair'
+) + _MONTHLY_TOTALS_TRIGGERS.format(
+    table='fuel_logs', cost='total_cost', kind='fuel'
+)
+
+# Rebuilds monthly_totals from the source tables (for databases that
+# predate it)
+MONTHLY_TOTALS_BACKFILL = """
+DELETE FROM monthly_totals;
+
+INSERT INTO monthly_totals (vin, month, repair_cost, repair_count)
+SELECT vin, strftime('%Y-%m', date) AS month, SUM(COALESCE(cost, 0)), COUNT(*)
+FROM repairs
+WHERE month IS NOT NULL
+GROUP BY vin, month;
+
+INSERT INTO monthly_totals (vin, month, fuel_cost, fuel_count)
+SELECT vin, strftime('%Y-%m', date) AS month, SUM(COALESCE(total_cost, 0)), COUNT(*)
+FROM fuel_logs
+WHERE month IS NOT NULL
+GROUP BY vin, month
+ON CONFLICT (vin, month) DO UPDATE SET
+    fuel_cost = excluded.fuel_cost,
+    fuel_count = excluded.fuel_count;
+"""
+
+SCHEMA_TABLES += MONTHLY_TOTALS_SCHEMA
+
+# Indexes are kept separate so bulk loads can insert rows first and build
+# each index once afterwards instead of updating it row by row
+SCHEMA_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_vehicles_user ON vehicles(user_id);
+CREATE INDEX IF NOT EXISTS idx_vehicles_make_model ON vehicles(make, model);
+CREATE INDEX IF NOT EXISTS idx_repairs_vin ON repairs(vin);
+CREATE INDEX IF NOT EXISTS idx_repairs_date ON repairs(date DESC);
+CREATE INDEX IF NOT EXISTS idx_repairs_vin_date ON repairs(vin, date DESC);
+CREATE INDEX IF NOT EXISTS idx_repairs_vin_updated ON repairs(vin, updated_at);
+CREATE INDEX IF NOT EXISTS idx_repairs_vin_date_id ON repairs(vin, date, id);
+CREATE INDEX IF NOT EXISTS idx_repairs_date_id ON repairs(date, id);
+CREATE INDEX IF NOT EXISTS idx_repairs_vin_cost ON repairs(vin, cost);
+CREATE INDEX IF NOT EXISTS idx_fuel_logs_vin ON fuel_logs(vin);
+CREATE INDEX IF NOT EXISTS idx_fuel_logs_date ON fuel_logs(date DESC);
+CREATE INDEX IF NOT EXISTS idx_fuel_logs_vin_date ON fuel_logs(vin, date DESC);
+CREATE INDEX IF NOT EXISTS idx_fuel_logs_vin_updated ON fuel_logs(vin, updated_at);
+CREATE INDEX IF NOT EXISTS idx_fuel_logs_vin_cost ON fuel_logs(vin, total_cost);
+CREATE INDEX IF NOT EXISTS idx_fuel_logs_vin_mpg ON fuel_logs(vin, full_tank, odometer DESC, gallons);
+CREATE INDEX IF NOT EXISTS idx_maintenance_vin ON maintenance_intervals(vin);
+CREATE INDEX IF NOT EXISTS idx_maintenance_next_due ON maintenance_intervals(next_due_mileage);
+CREATE INDEX IF NOT EXISTS idx_mileage_vin ON mileage_history(vin);
+CREATE INDEX IF NOT EXISTS idx_mileage_date ON mileage_history(date DESC);
+CREATE INDEX IF NOT EXISTS idx_mileage_vin_date ON mileage_history(vin, date DESC);
+CREATE INDEX IF NOT EXISTS idx_trips_vin ON trips(vin);
+CREATE INDEX IF NOT EXISTS idx_trips_date ON trips(date DESC);
+CREATE INDEX IF NOT EXISTS idx_trips_vin_date ON trips(vin, date DESC);
+CREATE INDEX IF NOT EXISTS idx_trips_vin_updated ON trips(vin, updated_at);
+CREATE INDEX IF NOT EXISTS idx_trips_vin_date_id ON trips(vin, date, id);
+CREATE INDEX IF NOT EXISTS idx_trips_date_id ON trips(date, id);
+CREATE INDEX IF NOT EXISTS idx_trips_business ON trips(is_business);
+CREATE INDEX IF NOT EXISTS idx_settings_key ON settings(key);
+CREATE INDEX IF NOT EXISTS idx_settings_user ON settings(user_id);
+"""
+
+# Full schema (tables followed by indexes)
+SCHEMA = SCHEMA_TABLES + SCHEMA_INDEXES
+
 # Current schema version
 CURRENT_VERSION = 1
 
@@ -204,7 +298,8 @@ TABLES = [
     'mileage_history',
     'trips',
     'settings',
-    'schema_version'
+    'schema_version',
+    'monthly_totals'
 ]
 
 # Default maintenance intervals (miles)
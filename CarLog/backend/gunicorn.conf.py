@@ -0,0 +1,27 @@
+"""
+Gunicorn Configuration
+======================
+Loaded automatically when gunicorn is started from this directory:
+
+    gunicorn app:app
+
+Set WEB_CONCURRENCY to override the worker count on small instances.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# gevent workers multiplex many in-flight requests per process; gunicorn
+# monkey-patches the worker before loading the app. sqlite3 calls are not
+# cooperative and hold their worker while they run, so several processes
+# are still needed to use every core.
+worker_class = 'gevent'
+worker_connections = 1000
+
+# Hold idle client connections open between requests (gunicorn's default is
+# 2s) so a burst of API calls from one client reuses its TCP/TLS connection.
+# Behind a load balancer, set it above the balancer's idle timeout.
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
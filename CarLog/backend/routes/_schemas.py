@@ -0,0 +1,261 @@
+"""
+Request Body Schemas
+====================
+JSON Schemas for POST/PUT bodies, compiled once at import with fastjsonschema.
+They check the shape of a body; the services still normalize the values.
+"""
+
+import fastjsonschema
+import orjson
+from flask import request
+
+from services.base_service import ValidationError
+
+# Numbers may arrive as strings from form-style clients; the services coerce them
+_NUMBER = {'type': ['number', 'string']}
+_OPTIONAL_NUMBER = {'type': ['number', 'string', 'null']}
+_TEXT = {'type': 'string', 'minLength': 1}
+_OPTIONAL_TEXT = {'type': ['string', 'null']}
+
+
+FUEL_LOG_CREATE_SCHEMA = {
+    'type': 'object',
+    'required': ['vin', 'gallons', 'price_per_gallon', 'odometer', 'date'],
+    'properties': {
+        'vin': _TEXT,
+        'gallons': _NUMBER,
+        'price_per_gallon': _NUMBER,
+        'total_cost': _OPTIONAL_NUMBER,
+        'odometer': _NUMBER,
+        'date': _TEXT,
+        'station': _OPTIONAL_TEXT,
+        'fuel_type': _OPTIONAL_TEXT,
+        'notes': _OPTIONAL_TEXT,
+    },
+}
+
+FUEL_LOG_UPDATE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'gallons': _OPTIONAL_NUMBER,
+        'price_per_gallon': _OPTIONAL_NUMBER,
+        'total_cost': _OPTIONAL_NUMBER,
+        'odometer': _OPTIONAL_NUMBER,
+        'date': _OPTIONAL_TEXT,
+        'station': _OPTIONAL_TEXT,
+        'fuel_type': _OPTIONAL_TEXT,
+        'notes': _OPTIONAL_TEXT,
+    },
+}
+
+MAINTENANCE_CREATE_SCHEMA = {
+    'type': 'object',
+    'required': ['vin', 'service_type'],
+    'properties': {
+        'vin': _TEXT,
+        'service_type': _TEXT,
+        'interval_miles': _OPTIONAL_NUMBER,
+        'interval_months': _OPTIONAL_NUMBER,
+        'last_performed_date': _OPTIONAL_TEXT,
+        'last_performed_mileage': _OPTIONAL_NUMBER,
+        'next_due_date': _OPTIONAL_TEXT,
+        'next_due_mileage': _OPTIONAL_NUMBER,
+        'notes': _OPTIONAL_TEXT,
+    },
+}
+
+MAINTENANCE_UPDATE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        key: value
+        for key, value in MAINTENANCE_CREATE_SCHEMA['properties'].items()
+        if key != 'vin'
+    },
+}
+
+SERVICE_RECORD_SCHEMA = {
+    'type': 'object',
+    'required': ['service_type'],
+    'properties': {
+        'service_type': _TEXT,
+        'date': _OPTIONAL_TEXT,
+        'mileage': _OPTIONAL_NUMBER,
+    },
+}
+
+MILEAGE_CREATE_SCHEMA = {
+    'type': 'object',
+    'required': ['vin', 'mileage', 'date'],
+    'properties': {
+        'vin': _TEXT,
+        'mileage': _NUMBER,
+        'date': _TEXT,
+        'source': _OPTIONAL_TEXT,
+        'notes': _OPTIONAL_TEXT,
+    },
+}
+
+LEGACY_REPAIR_SCHEMA = {
+    'type': 'object',
+    'required': ['vin', 'service', 'cost', 'date'],
+    'properties': {
+        'vin': _TEXT,
+        'service': _TEXT,
+        'cost': _NUMBER,
+        'date': _TEXT,
+    },
+}
+
+REPAIR_CREATE_SCHEMA = {
+    'type': 'object',
+    'required': ['vin', 'service', 'date'],
+    'properties': {
+        'vin': _TEXT,
+        'service': _TEXT,
+        'description': _OPTIONAL_TEXT,
+        'cost': _OPTIONAL_NUMBER,
+        'mileage': _OPTIONAL_NUMBER,
+        'date': _TEXT,
+        'shop_name': _OPTIONAL_TEXT,
+        'notes': _OPTIONAL_TEXT,
+    },
+}
+
+REPAIR_UPDATE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        key: value
+        for key, value in REPAIR_CREATE_SCHEMA['properties'].items()
+        if key != 'vin'
+    },
+}
+
+TRIP_CREATE_SCHEMA = {
+    'type': 'object',
+    'required': ['vin', 'date'],
+    'properties': {
+        'vin': _TEXT,
+        'start_location': _OPTIONAL_TEXT,
+        'end_location': _OPTIONAL_TEXT,
+        'start_mileage': _OPTIONAL_NUMBER,
+        'end_mileage': _OPTIONAL_NUMBER,
+        'distance': _OPTIONAL_NUMBER,
+        'date': _TEXT,
+        'purpose': _OPTIONAL_TEXT,
+        'is_business': {'type': ['boolean', 'number', 'null']},
+        'notes': _OPTIONAL_TEXT,
+    },
+}
+
+TRIP_UPDATE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        key: value
+        for key, value in TRIP_CREATE_SCHEMA['properties'].items()
+        if key != 'vin'
+    },
+}
+
+USER_CREATE_SCHEMA = {
+    'type': 'object',
+    'required': ['name'],
+    'properties': {
+        'name': _TEXT,
+        'email': _OPTIONAL_TEXT,
+    },
+}
+
+USER_UPDATE_SCHEMA = {
+    'type': 'object',
+    'properties': USER_CREATE_SCHEMA['properties'],
+}
+
+# Setting values are free-form; SettingsService checks the theme itself
+SETTING_SCHEMA = {'type': 'object', 'required': ['value']}
+THEME_SCHEMA = {'type': 'object', 'required': ['theme']}
+SETTINGS_BULK_SCHEMA = {
+    'type': 'object',
+    'required': ['settings'],
+    'properties': {
+        'settings': {'type': 'object', 'minProperties': 1},
+    },
+}
+
+# Bulk create bodies (POST .../batch); each row is then checked by the service
+MAX_BATCH_SIZE = 1000
+
+BATCH_SCHEMA = {
+    'type': 'array',
+    'minItems': 1,
+    'maxItems': MAX_BATCH_SIZE,
+    'items': {'type': 'object'},
+}
+BATCH_ERROR = f"Body must be a JSON array of 1 to {MAX_BATCH_SIZE} objects"
+
+# POST /api/vehicles/decode-vin/batch; one vPIC batch request's worth
+MAX_VIN_BATCH = 50
+
+VIN_BATCH_SCHEMA = {
+    'type': 'object',
+    'required': ['vins'],
+    'properties': {
+        'vins': {
+            'type': 'array',
+            'minItems': 1,
+            'maxItems': MAX_VIN_BATCH,
+            'items': {'type': 'string', 'minLength': 17, 'maxLength': 17},
+        },
+    },
+}
+VIN_BATCH_ERROR = f"vins must be a list of 1 to {MAX_VIN_BATCH} 17-character VINs"
+
+validate_fuel_log_create = fastjsonschema.compile(FUEL_LOG_CREATE_SCHEMA)
+validate_fuel_log_update = fastjsonschema.compile(FUEL_LOG_UPDATE_SCHEMA)
+validate_maintenance_create = fastjsonschema.compile(MAINTENANCE_CREATE_SCHEMA)
+validate_maintenance_update = fastjsonschema.compile(MAINTENANCE_UPDATE_SCHEMA)
+validate_service_record = fastjsonschema.compile(SERVICE_RECORD_SCHEMA)
+validate_mileage_create = fastjsonschema.compile(MILEAGE_CREATE_SCHEMA)
+validate_legacy_repair = fastjsonschema.compile(LEGACY_REPAIR_SCHEMA)
+validate_batch = fastjsonschema.compile(BATCH_SCHEMA)
+validate_vin_batch = fastjsonschema.compile(VIN_BATCH_SCHEMA)
+validate_repair_create = fastjsonschema.compile(REPAIR_CREATE_SCHEMA)
+validate_repair_update = fastjsonschema.compile(REPAIR_UPDATE_SCHEMA)
+validate_trip_create = fastjsonschema.compile(TRIP_CREATE_SCHEMA)
+validate_trip_update = fastjsonschema.compile(TRIP_UPDATE_SCHEMA)
+validate_user_create = fastjsonschema.compile(USER_CREATE_SCHEMA)
+validate_user_update = fastjsonschema.compile(USER_UPDATE_SCHEMA)
+validate_setting = fastjsonschema.compile(SETTING_SCHEMA)
+validate_theme = fastjsonschema.compile(THEME_SCHEMA)
+validate_settings_bulk = fastjsonschema.compile(SETTINGS_BULK_SCHEMA)
+
+
+def read_body(validator, error=None):
+    """
+    Read the request's JSON body and check it with a compiled validator.
+    Failures raise ValidationError (a 400), using error as the message
+    when given, including for an empty body such as {}.
+    
+    The body is decoded straight from the raw bytes with orjson, without
+    Flask's content-type check and without caching either the bytes or the
+    parsed object on the request; these handlers read it exactly once.
+    """
+    raw = request.get_data(cache=False)
+    if not raw:
+        raise ValidationError("No data provided")
+    try:
+        data = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        raise ValidationError("Request body is not valid JSON")
+    if not data:
+        raise ValidationError(error or "No data provided")
+    
+    try:
+        validator(data)
+    except fastjsonschema.JsonSchemaValueException as e:
+        if error:
+            raise ValidationError(error)
+        if e.rule == 'required':
+            missing = [f for f in e.rule_definition if f not in data]
+            raise ValidationError(f"Missing required fields: {', '.join(missing)}")
+        raise ValidationError(e.message)
+    return data
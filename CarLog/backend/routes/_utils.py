@@ -0,0 +1,385 @@
+"""
+Route Helpers
+=============
+Shared response plumbing for the API blueprints.
+"""
+
+import base64
+import binascii
+import hashlib
+import logging
+import time
+from functools import wraps
+
+from flask import Response, current_app, g, request, stream_with_context
+
+from services.base_service import ValidationError, validate_vin
+from utils.cache import TTLCache
+
+try:
+    import msgpack
+except ImportError:  # optional; every endpoint still speaks JSON
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+# Upper bound for ?limit= on every list endpoint
+MAX_LIMIT = 200
+
+# Upper bounds for the look-back windows of the trend endpoints
+MAX_DAYS = 3650
+MAX_MONTHS = 120
+
+# Streamed responses give other requests a turn after this many rows
+STREAM_YIELD_EVERY = 50
+
+# Fixed framing of the {'success': True, 'data': [...], 'count': n} envelope
+_LIST_PREFIX = b'{"success":true,"data":'
+_LIST_SUFFIX = b',"count":%d}'
+
+# Methods whose requests run in one write transaction, see is_write_request
+_WRITE_METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+
+# Serialized bodies of cached GET endpoints, see cached_endpoint
+_response_cache = TTLCache(maxsize=512, ttl=30)
+
+# Recently computed data versions, so a burst of cache hits skips SQLite
+# entirely. Writes in this process clear it; writes in other workers show
+# up within VERSION_TTL seconds (well inside the responses' max-age).
+VERSION_TTL = 5
+_version_cache = TTLCache(maxsize=1024, ttl=VERSION_TTL)
+
+
+def json_response(payload, status=200):
+    """Serialize a payload with the app's JSON provider into a Response."""
+    response = current_app.json.response(payload)
+    response.status_code = status
+    return response
+
+
+def ok(status=200, **fields):
+    """
+    Respond with ``{'success': true, **fields}``. The body is encoded with
+    orjson straight to bytes, skipping jsonify's argument handling.
+    """
+    body = current_app.json.dumps_bytes({'success': True, **fields})
+    return Response(body, status=status, mimetype='application/json')
+
+
+def fail(message, status=400):
+    """Respond with ``{'success': false, 'error': message}``."""
+    body = current_app.json.dumps_bytes({'success': False, 'error': message})
+    return Response(body, status=status, mimetype='application/json')
+
+
+def wants_msgpack():
+    """True when msgpack is available and the client prefers it over JSON."""
+    if msgpack is None:
+        return False
+    best = request.accept_mimetypes.best_match(['application/json', MSGPACK_MIMETYPE])
+    return best == MSGPACK_MIMETYPE
+
+
+def smart_response(payload, status=200):
+    """
+    Serialize a payload as JSON, or as MessagePack when the client asks for
+    it with ``Accept: application/msgpack``. JSON stays the default for
+    wildcard Accept headers and when msgpack is not installed.
+    """
+    if msgpack is not None:
+        if wants_msgpack():
+            body = msgpack.packb(payload, use_bin_type=True, default=current_app.json.default)
+            response = Response(body, status=status, mimetype=MSGPACK_MIMETYPE)
+        else:
+            response = json_response(payload, status)
+        response.vary.add('Accept')
+        return response
+    return json_response(payload, status)
+
+
+def list_response(rows):
+    """
+    Respond with the standard list envelope. The framing is precomputed, so
+    only the rows go through the encoder; msgpack clients get smart_response.
+    """
+    if wants_msgpack():
+        return smart_response({'success': True, 'data': rows, 'count': len(rows)})
+    body = _LIST_PREFIX + current_app.json.dumps_bytes(rows) + _LIST_SUFFIX % len(rows)
+    response = Response(body, mimetype='application/json')
+    if msgpack is not None:
+        response.vary.add('Accept')
+    return response
+
+
+def _cooperative(rows):
+    """
+    Pass rows through, sleeping for zero seconds every STREAM_YIELD_EVERY
+    rows. Under gunicorn's gevent worker time.sleep is patched, so this
+    hands the hub to other in-flight requests while a long list encodes;
+    with plain threads it merely offers up the GIL.
+    """
+    for i, row in enumerate(rows, 1):
+        yield row
+        if i % STREAM_YIELD_EVERY == 0:
+            time.sleep(0)
+
+
+def json_text_response(body):
+    """
+    Respond with JSON text the database already rendered (for example via
+    json_group_array). MessagePack clients get it decoded and re-packed.
+    """
+    if wants_msgpack():
+        return smart_response(current_app.json.loads(body))
+    response = Response(body, mimetype='application/json')
+    if msgpack is not None:
+        response.vary.add('Accept')
+    return response
+
+
+def stream_list(rows):
+    """
+    Respond with an iterable of rows as a bare JSON array, encoding and
+    sending each row as it is pulled from the database cursor.
+    """
+    if wants_msgpack():
+        return smart_response(list(rows))
+    
+    dumps = current_app.json.dumps_bytes
+    
+    def generate():
+        yield b'['
+        for i, row in enumerate(_cooperative(rows)):
+            yield (b',' if i else b'') + dumps(row)
+        yield b']'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def stream_page(rows, limit=None):
+    """
+    Streaming counterpart of smart_response({'success': True, 'data': rows,
+    'count': ...}). With limit, next_cursor is added as for keyset pages.
+    
+    Rows should come from a lazy query (e.g. iter_rows) whose arguments
+    were validated up front; once streaming starts the status is fixed.
+    """
+    if wants_msgpack():
+        rows = list(rows)
+        payload = {'success': True, 'data': rows, 'count': len(rows)}
+        if limit is not None:
+            payload['next_cursor'] = next_cursor(rows, limit)
+        return smart_response(payload)
+    
+    dumps = current_app.json.dumps_bytes
+    
+    def generate():
+        yield _LIST_PREFIX + b'['
+        count = 0
+        last = None
+        for row in _cooperative(rows):
+            yield (b',' if count else b'') + dumps(row)
+            count += 1
+            last = row
+        
+        tail = {'count': count}
+        if limit is not None:
+            tail['next_cursor'] = encode_cursor(last) if last and count >= limit else None
+        # Splice the trailing keys into the open object: '{"count":..}' -> ',"count":..}'
+        yield b'],' + dumps(tail)[1:]
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def clamp_arg(name, default, max_):
+    """
+    Read a positive integer query parameter, falling back to default and
+    capped at max_ (clamping is logged so oversized requests show up).
+    Anything that is not a positive integer raises ValidationError (a 400).
+    """
+    raw = request.args.get(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise ValidationError(f"{name} must be a positive integer")
+    if value > max_:
+        logger.warning(
+            "Clamped %s=%d to %d on %s from %s",
+            name, value, max_, request.path, request.remote_addr
+        )
+        return max_
+    return value
+
+
+def clamp_limit(default, max_=MAX_LIMIT):
+    """Read ?limit= (see clamp_arg), capped at MAX_LIMIT by default."""
+    return clamp_arg('limit', default, max_)
+
+
+def read_offset():
+    """Read ?offset=, defaulting to 0; negative or non-numeric is a 400."""
+    raw = request.args.get('offset')
+    if raw is None:
+        return 0
+    try:
+        offset = int(raw)
+    except ValueError:
+        offset = -1
+    if offset < 0:
+        raise ValidationError("offset must be a non-negative integer")
+    return offset
+
+
+def validated_vin(vin):
+    """Normalize a VIN once per request; repeat lookups hit flask.g."""
+    if 'vin_cache' not in g:
+        g.vin_cache = {}
+    if vin not in g.vin_cache:
+        g.vin_cache[vin] = validate_vin(vin)
+    return g.vin_cache[vin]
+
+
+def encode_cursor(row):
+    """Opaque keyset-pagination token for the (date, id) of a row."""
+    raw = f"{row['date']}|{row['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; None passes through, garbage is a 400."""
+    if not token:
+        return None
+    try:
+        date, row_id = base64.urlsafe_b64decode(token.encode()).decode().rsplit('|', 1)
+        return date, int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError("Invalid cursor")
+
+
+def next_cursor(rows, limit):
+    """Cursor for the page after rows, or None when this was the last page."""
+    if len(rows) < limit or not rows:
+        return None
+    return encode_cursor(rows[-1])
+
+
+def json_endpoint(view):
+    """
+    Decorator for handlers that return a payload dict (or a
+    ``(payload, status)`` tuple) instead of a Flask response. Exceptions
+    are left to the app's error handlers.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        result = view(*args, **kwargs)
+        if isinstance(result, tuple):
+            return json_response(*result)
+        return json_response(result)
+    return wrapper
+
+
+def etagged(view):
+    """
+    Give a GET view's 200 responses a body-derived ETag and answer a
+    matching ``If-None-Match`` with an empty 304. Responses are marked
+    ``private, no-cache`` so clients revalidate instead of serving an
+    entry they may have just edited. HEAD responses are passed through,
+    since views may answer them without building the body.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.is_streamed or request.method == 'HEAD':
+            return response
+        
+        response.set_etag(hashlib.blake2b(response.get_data(), digest_size=16).hexdigest())
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return wrapper
+
+
+def read_only(view):
+    """
+    Mark a POST view that never writes to the database (e.g. a lookup that
+    takes its input as a body). It then runs outside the request's write
+    transaction, so it doesn't hold the write lock while it works, and it
+    doesn't clear the response cache when it succeeds.
+    """
+    view.read_only = True
+    return view
+
+
+def is_write_request():
+    """Whether this request runs in a write transaction (see read_only)."""
+    if request.method not in _WRITE_METHODS:
+        return False
+    view = current_app.view_functions.get(request.endpoint)
+    if view is None:
+        # No route matched; the 404/405 response writes nothing
+        return False
+    return not getattr(view, 'read_only', False)
+
+
+def invalidate_cached_responses():
+    """
+    Drop every memoized response and data version. Called after each
+    committed write, since the data version only has one-second resolution
+    within a process; other worker processes still rely on the version
+    changing.
+    """
+    _response_cache.clear()
+    _version_cache.clear()
+
+
+def cached_endpoint(version, max_age=30):
+    """
+    Memoize the successful responses of a GET view.
+    
+    ``version`` is called with the view's URL arguments and returns a cheap
+    fingerprint of the data the view reads; it is part of the cache key, so
+    a write makes old entries unreachable and they simply age out. Unless
+    max_age is 0, the fingerprint itself is reused for up to VERSION_TTL
+    seconds. Responses carry a body-derived ETag and ``Cache-Control:
+    max-age``, and a matching ``If-None-Match`` is answered with a 304. Use
+    max_age=0 for data the client edits directly, so it always revalidates.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            view_args = tuple(sorted(kwargs.items()))
+            fingerprint = _version_cache.get((version, view_args)) if max_age else None
+            if fingerprint is None:
+                fingerprint = version(**kwargs)
+                if max_age:
+                    _version_cache.set((version, view_args), fingerprint)
+            
+            key = (
+                view.__module__,
+                view.__name__,
+                view_args,
+                tuple(sorted(request.args.items(multi=True))),
+                fingerprint,
+            )
+            cached = _response_cache.get(key)
+            if cached is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                cached = (body, hashlib.sha1(body).hexdigest())
+                _response_cache.set(key, cached)
+            
+            body, etag = cached
+            response = Response(body, mimetype='application/json')
+            response.set_etag(etag)
+            response.cache_control.max_age = max_age
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
@@ -4,133 +4,75 @@ Analytics API Routes
 Endpoints for analytics and reporting.
 """
 
-from flask import Blueprint, request, jsonify
-import sys
-import os
-
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from flask import Blueprint
 
 from services.analytics_service import AnalyticsService
-from services.base_service import ValidationError
+from routes._utils import json_endpoint, cached_endpoint, clamp_arg, MAX_MONTHS
 
 analytics_bp = Blueprint('analytics', __name__)
 
 
 @analytics_bp.route('/dashboard/<vin>', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version)
+@json_endpoint
 def get_dashboard(vin):
     """Get comprehensive dashboard data for a vehicle."""
-    try:
-        dashboard = AnalyticsService.get_vehicle_dashboard(vin)
-        
-        if 'error' in dashboard:
-            return jsonify({
-                'success': False,
-                'error': dashboard['error']
-            }), 404
-        
-        return jsonify({
-            'success': True,
-            'data': dashboard
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    dashboard = AnalyticsService.get_vehicle_dashboard(vin)
+    
+    if 'error' in dashboard:
+        return {'success': False, 'error': dashboard['error']}, 404
+    
+    return {'success': True, 'data': dashboard}
 
 
 @analytics_bp.route('/mpg/<vin>', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version)
+@json_endpoint
 def get_mpg(vin):
     """Get MPG statistics for a vehicle."""
-    try:
-        mpg_data = AnalyticsService.calculate_mpg(vin)
-        
-        return jsonify({
-            'success': True,
-            'data': mpg_data
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return {'success': True, 'data': AnalyticsService.calculate_mpg(vin)}
 
 
 @analytics_bp.route('/cost-per-mile/<vin>', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version)
+@json_endpoint
 def get_cost_per_mile(vin):
     """Get cost per mile statistics for a vehicle."""
-    try:
-        cpm_data = AnalyticsService.calculate_cost_per_mile(vin)
-        
-        return jsonify({
-            'success': True,
-            'data': cpm_data
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return {'success': True, 'data': AnalyticsService.calculate_cost_per_mile(vin)}
 
 
 @analytics_bp.route('/spending/<vin>', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version)
+@json_endpoint
 def get_monthly_spending(vin):
     """Get monthly spending breakdown for a vehicle."""
-    try:
-        months = request.args.get('months', 12, type=int)
-        spending = AnalyticsService.get_monthly_spending(vin, months=months)
-        
-        return jsonify({
-            'success': True,
-            'data': spending
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    months = clamp_arg('months', 12, MAX_MONTHS)
+    spending = AnalyticsService.get_monthly_spending(vin, months=months)
+    return {'success': True, 'data': spending}
 
 
 @analytics_bp.route('/spending-by-category/<vin>', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version)
+@json_endpoint
 def get_spending_by_category(vin):
     """Get spending breakdown by repair category."""
-    try:
-        categories = AnalyticsService.get_spending_by_category(vin)
-        
-        return jsonify({
-            'success': True,
-            'data': categories
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return {'success': True, 'data': AnalyticsService.get_spending_by_category(vin)}
 
 
 @analytics_bp.route('/fuel-prices/<vin>', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version)
+@json_endpoint
 def get_fuel_price_trend(vin):
     """Get fuel price trend for a vehicle."""
-    try:
-        months = request.args.get('months', 6, type=int)
-        trend = AnalyticsService.get_fuel_price_trend(vin, months=months)
-        
-        return jsonify({
-            'success': True,
-            'data': trend
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    months = clamp_arg('months', 6, MAX_MONTHS)
+    trend = AnalyticsService.get_fuel_price_trend(vin, months=months)
+    return {'success': True, 'data': trend}
 
 
 @analytics_bp.route('/summary', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version)
+@json_endpoint
 def get_all_vehicles_summary():
     """Get summary for all vehicles."""
-    try:
-        summary = AnalyticsService.get_all_vehicles_summary()
-        
-        return jsonify({
-            'success': True,
-            'data': summary,
-            'count': len(summary)
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
+    summary = AnalyticsService.get_all_vehicles_summary()
+    return {'success': True, 'data': summary, 'count': len(summary)}
@@ -5,17 +5,21 @@ Backward-compatible endpoints for existing Flutter app.
 These routes maintain the old API structure while using new services.
 """
 
-from flask import Blueprint, request, jsonify
-import sys
-import os
-
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from flask import Blueprint, jsonify
 
 from services.vehicle_service import VehicleService
 from services.repair_service import RepairService
 from services.maintenance_service import MaintenanceService
 from services.fuel_log_service import FuelLogService
+from services.analytics_service import AnalyticsService
 from services.base_service import ValidationError
+from routes._utils import (
+    cached_endpoint,
+    stream_list,
+    etagged,
+    json_text_response,
+)
+from routes._schemas import read_body, validate_legacy_repair
 
 legacy_bp = Blueprint('legacy', __name__)
 
@@ -24,7 +28,19 @@ legacy_bp = Blueprint('legacy', __name__)
 # Legacy Vehicle Routes (matches old /car/<vin>)
 # =============================================================================
 
+# old /car/<vin> key -> vehicles column
+_LEGACY_VEHICLE_MAP = (
+    ('VIN', 'vin'),
+    ('Year', 'year'),
+    ('Make', 'make'),
+    ('Model', 'model'),
+    ('Trim', 'trim'),
+    ('engine_type', 'engine_type'),
+)
+
+
 @legacy_bp.route('/car/<vin>', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version, max_age=0)
 def legacy_get_vehicle(vin):
     """Legacy: Get vehicle by VIN."""
     try:
@@ -34,14 +50,7 @@ def legacy_get_vehicle(vin):
             return jsonify({'error': 'Vehicle not found'}), 404
         
         # Return in old format
-        return jsonify({
-            'VIN': vehicle['vin'],
-            'Year': vehicle['year'],
-            'Make': vehicle['make'],
-            'Model': vehicle['model'],
-            'Trim': vehicle.get('trim', ''),
-            'engine_type': vehicle.get('engine_type', '')
-        })
+        return jsonify({key: vehicle.get(column, '') for key, column in _LEGACY_VEHICLE_MAP})
     except ValidationError:
         return jsonify({'error': 'Invalid VIN'}), 400
     except Exception as e:
@@ -52,7 +61,17 @@ def legacy_get_vehicle(vin):
 # Legacy Maintenance Routes (matches old /maintenance/<vin>)
 # =============================================================================
 
+# service_type -> field name in the old /maintenance/<vin> payload
+_LEGACY_FIELD_MAP = {
+    'Oil Change': 'oil_change',
+    'Transmission Fluid': 'transmission_fluid_change',
+    'Brake Inspection': 'brake_service',
+    'Air Filter': 'air_filter_check',
+}
+
+
 @legacy_bp.route('/maintenance/<vin>', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version, max_age=0)
 def legacy_get_maintenance(vin):
     """Legacy: Get maintenance intervals by VIN."""
     try:
@@ -64,15 +83,9 @@ def legacy_get_maintenance(vin):
         # Convert to old format
         result = {'VIN': vin}
         for interval in intervals:
-            service = interval['service_type']
-            if service == 'Oil Change':
-                result['oil_change'] = interval['interval_miles']
-            elif service == 'Transmission Fluid':
-                result['transmission_fluid_change'] = interval['interval_miles']
-            elif service == 'Brake Inspection':
-                result['brake_service'] = interval['interval_miles']
-            elif service == 'Air Filter':
-                result['air_filter_check'] = interval['interval_miles']
+            key = _LEGACY_FIELD_MAP.get(interval['service_type'])
+            if key:
+                result[key] = interval['interval_miles']
         
         return jsonify(result)
     except ValidationError:
@@ -86,20 +99,12 @@ def legacy_get_maintenance(vin):
 # =============================================================================
 
 @legacy_bp.route('/repair/repairs/<vin>', methods=['GET'])
+@etagged
 def legacy_get_repairs(vin):
     """Legacy: Get repairs by VIN."""
     try:
-        repairs = RepairService.get_by_vin(vin)
-        
-        # Return in old format (list of simplified repairs)
-        return jsonify([
-            {
-                'service': r['service'],
-                'cost': r['cost'],
-                'date': r['date']
-            }
-            for r in repairs
-        ]), 200
+        # Old format (list of simplified repairs), built by SQLite
+        return json_text_response(RepairService.get_by_vin_summary_json(vin))
     except ValidationError:
         return jsonify([]), 200
     except Exception as e:
@@ -110,26 +115,16 @@ def legacy_get_repairs(vin):
 def legacy_create_repair():
     """Legacy: Create a repair."""
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-        
-        vin = data.get('vin')
-        service = data.get('service')
-        cost = data.get('cost')
-        date = data.get('date')
-        
-        if not all([vin, service, cost is not None, date]):
-            return jsonify({
-                'error': 'Missing required fields: vin, service, cost, date'
-            }), 400
+        data = read_body(
+            validate_legacy_repair,
+            error='Missing required fields: vin, service, cost, date'
+        )
         
         RepairService.create({
-            'vin': vin,
-            'service': service,
-            'cost': cost,
-            'date': date
+            'vin': data['vin'],
+            'service': data['service'],
+            'cost': data['cost'],
+            'date': data['date']
         })
         
         return jsonify({'message': 'Repair added successfully'}), 201
@@ -146,9 +141,5 @@ def legacy_create_repair():
 @legacy_bp.route('/fuel/', methods=['GET'])
 def legacy_get_fuel_logs():
     """Legacy: Get all fuel logs."""
-    try:
-        logs = FuelLogService.get_all(limit=100)
-        return jsonify(logs)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return stream_list(FuelLogService.iter_all(limit=100))
 
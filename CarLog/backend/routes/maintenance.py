@@ -5,238 +5,169 @@ RESTful endpoints for maintenance interval management.
 """
 
 from flask import Blueprint, request, jsonify
-import sys
-import os
-
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from services.maintenance_service import MaintenanceService
-from services.base_service import ValidationError, NotFoundError
+from routes._utils import list_response, cached_endpoint, clamp_limit, etagged, validated_vin
+from routes._schemas import (
+    read_body,
+    validate_maintenance_create,
+    validate_maintenance_update,
+    validate_service_record,
+)
+from services.analytics_service import AnalyticsService
 
 maintenance_bp = Blueprint('maintenance', __name__)
 
 
 @maintenance_bp.route('', methods=['GET'])
+@etagged
 def get_maintenance():
     """
     Get maintenance intervals, optionally filtered by VIN.
     Query params: vin
     """
-    try:
-        vin = request.args.get('vin')
-        
-        if vin:
-            intervals = MaintenanceService.get_by_vin(vin)
-        else:
-            intervals = MaintenanceService.get_all(limit=100)
-        
-        return jsonify({
-            'success': True,
-            'data': intervals,
-            'count': len(intervals)
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    vin = request.args.get('vin')
+    
+    if vin:
+        intervals = MaintenanceService.get_by_vin(vin)
+    else:
+        intervals = MaintenanceService.get_all(limit=100)
+    
+    return list_response(intervals)
 
 
 @maintenance_bp.route('/vehicle/<vin>', methods=['GET'])
+@etagged
 def get_vehicle_maintenance(vin):
     """Get maintenance schedule for a specific vehicle."""
-    try:
-        schedule = MaintenanceService.get_maintenance_schedule(vin)
-        
-        return jsonify({
-            'success': True,
-            'data': schedule
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    vin = validated_vin(vin)
+    schedule = MaintenanceService.get_maintenance_schedule(vin)
+    
+    return jsonify({
+        'success': True,
+        'data': schedule
+    })
 
 
-@maintenance_bp.route('/<int:interval_id>', methods=['GET'])
+@maintenance_bp.route('/<int:interval_id>', methods=['GET', 'HEAD'])
+@etagged
 def get_maintenance_interval(interval_id):
     """Get a single maintenance interval by ID."""
-    try:
-        interval = MaintenanceService.get_by_id(interval_id)
-        
-        if not interval:
-            return jsonify({
-                'success': False,
-                'error': 'Maintenance interval not found'
-            }), 404
-        
+    if request.method == 'HEAD':
+        return '', 200 if MaintenanceService.exists(interval_id) else 404
+    
+    interval = MaintenanceService.get_by_id(interval_id)
+    
+    if not interval:
         return jsonify({
-            'success': True,
-            'data': interval
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+            'success': False,
+            'error': 'Maintenance interval not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': interval
+    })
 
 
 @maintenance_bp.route('', methods=['POST'])
 def create_maintenance():
     """Create a new maintenance interval."""
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': 'No data provided'
-            }), 400
-        
-        interval = MaintenanceService.create(data)
-        
-        return jsonify({
-            'success': True,
-            'data': interval,
-            'message': 'Maintenance interval created successfully'
-        }), 201
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except NotFoundError as e:
-        return jsonify({'success': False, 'error': e.message}), 404
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    data = read_body(validate_maintenance_create)
+    
+    interval = MaintenanceService.create(data)
+    
+    return jsonify({
+        'success': True,
+        'data': interval,
+        'message': 'Maintenance interval created successfully'
+    }), 201
 
 
 @maintenance_bp.route('/<int:interval_id>', methods=['PUT', 'PATCH'])
 def update_maintenance(interval_id):
     """Update a maintenance interval."""
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': 'No data provided'
-            }), 400
-        
-        interval = MaintenanceService.update(interval_id, data)
-        
-        return jsonify({
-            'success': True,
-            'data': interval,
-            'message': 'Maintenance interval updated successfully'
-        })
-    except NotFoundError as e:
-        return jsonify({'success': False, 'error': e.message}), 404
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    data = read_body(validate_maintenance_update)
+    
+    interval = MaintenanceService.update(interval_id, data)
+    
+    return jsonify({
+        'success': True,
+        'data': interval,
+        'message': 'Maintenance interval updated successfully'
+    })
 
 
 @maintenance_bp.route('/<int:interval_id>', methods=['DELETE'])
 def delete_maintenance(interval_id):
     """Delete a maintenance interval."""
-    try:
-        MaintenanceService.delete(interval_id)
-        
-        return jsonify({
-            'success': True,
-            'message': 'Maintenance interval deleted successfully'
-        })
-    except NotFoundError as e:
-        return jsonify({'success': False, 'error': e.message}), 404
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    MaintenanceService.delete(interval_id)
+    
+    return jsonify({
+        'success': True,
+        'message': 'Maintenance interval deleted successfully'
+    })
 
 
 @maintenance_bp.route('/vehicle/<vin>/record', methods=['POST'])
 def record_service(vin):
     """Record that a maintenance service was performed."""
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': 'No data provided'
-            }), 400
-        
-        service_type = data.get('service_type')
-        date = data.get('date')
-        mileage = data.get('mileage')
-        
-        if not service_type:
-            return jsonify({
-                'success': False,
-                'error': 'service_type is required'
-            }), 400
-        
-        interval = MaintenanceService.record_service(
-            vin, 
-            service_type, 
-            date=date, 
-            mileage=mileage
-        )
-        
-        return jsonify({
-            'success': True,
-            'data': interval,
-            'message': f'{service_type} recorded successfully'
-        })
-    except NotFoundError as e:
-        return jsonify({'success': False, 'error': e.message}), 404
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    data = read_body(validate_service_record, error='service_type is required')
+    
+    service_type = data['service_type']
+    date = data.get('date')
+    mileage = data.get('mileage')
+    
+    interval = MaintenanceService.record_service(
+        vin, 
+        service_type, 
+        date=date, 
+        mileage=mileage
+    )
+    
+    return jsonify({
+        'success': True,
+        'data': interval,
+        'message': f'{service_type} recorded successfully'
+    })
 
 
 @maintenance_bp.route('/vehicle/<vin>/upcoming', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version, max_age=0)
 def get_upcoming_maintenance(vin):
     """Get upcoming maintenance items for a vehicle."""
-    try:
-        limit = request.args.get('limit', 5, type=int)
-        upcoming = MaintenanceService.get_upcoming(vin, limit=limit)
-        
-        return jsonify({
-            'success': True,
-            'data': upcoming
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    vin = validated_vin(vin)
+    limit = clamp_limit(5)
+    upcoming = MaintenanceService.get_upcoming(vin, limit=limit)
+    
+    return jsonify({
+        'success': True,
+        'data': upcoming
+    })
 
 
 @maintenance_bp.route('/vehicle/<vin>/overdue', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version, max_age=0)
 def get_overdue_maintenance(vin):
     """Get overdue maintenance items for a vehicle."""
-    try:
-        overdue = MaintenanceService.get_overdue(vin)
-        
-        return jsonify({
-            'success': True,
-            'data': overdue,
-            'count': len(overdue)
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    vin = validated_vin(vin)
+    overdue = MaintenanceService.get_overdue(vin)
+    
+    # Plain JSON: cached_endpoint replays one body whatever the Accept header
+    return jsonify({
+        'success': True,
+        'data': overdue,
+        'count': len(overdue)
+    })
 
 
 @maintenance_bp.route('/vehicle/<vin>/initialize', methods=['POST'])
 def initialize_maintenance(vin):
     """Initialize default maintenance intervals for a vehicle."""
-    try:
-        intervals = MaintenanceService.initialize_for_vehicle(vin)
-        
-        return jsonify({
-            'success': True,
-            'data': intervals,
-            'message': 'Maintenance intervals initialized successfully'
-        })
-    except NotFoundError as e:
-        return jsonify({'success': False, 'error': e.message}), 404
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    intervals = MaintenanceService.initialize_for_vehicle(vin)
+    
+    return jsonify({
+        'success': True,
+        'data': intervals,
+        'message': 'Maintenance intervals initialized successfully'
+    })
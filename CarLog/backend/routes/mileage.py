@@ -5,13 +5,24 @@ RESTful endpoints for mileage history management.
 """
 
 from flask import Blueprint, request, jsonify
-import sys
-import os
-
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from services.mileage_service import MileageService
-from services.base_service import ValidationError, NotFoundError
+from routes._utils import (
+    smart_response,
+    decode_cursor,
+    next_cursor,
+    cached_endpoint,
+    clamp_limit,
+    read_offset,
+    stream_page,
+    etagged,
+    validated_vin,
+    clamp_arg,
+    MAX_DAYS,
+    MAX_MONTHS,
+)
+from routes._schemas import read_body, validate_mileage_create
+from services.analytics_service import AnalyticsService
 
 mileage_bp = Blueprint('mileage', __name__)
 
@@ -20,142 +31,113 @@ mileage_bp = Blueprint('mileage', __name__)
 def get_mileage():
     """
     Get mileage history, optionally filtered by VIN.
-    Query params: vin, limit, offset
+    Query params: vin, limit, offset, cursor (with vin, taken from next_cursor)
     """
-    try:
-        vin = request.args.get('vin')
-        limit = request.args.get('limit', 50, type=int)
-        offset = request.args.get('offset', 0, type=int)
-        
-        if vin:
-            history = MileageService.get_by_vin(vin, limit=limit, offset=offset)
-        else:
-            history = MileageService.get_all(limit=limit, offset=offset, order_by='date')
-        
-        return jsonify({
-            'success': True,
-            'data': history,
-            'count': len(history)
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    vin = request.args.get('vin')
+    limit = clamp_limit(50)
+    offset = read_offset()
+    
+    if vin:
+        cursor = decode_cursor(request.args.get('cursor'))
+        history = MileageService.iter_by_vin(vin, limit=limit, offset=offset, cursor=cursor)
+        return stream_page(history, limit=limit)
+    
+    history = MileageService.iter_all(limit=limit, offset=offset, order_by='date')
+    return stream_page(history)
 
 
 @mileage_bp.route('/vehicle/<vin>', methods=['GET'])
+@etagged
 def get_mileage_by_vehicle(vin):
     """Get mileage history for a specific vehicle."""
-    try:
-        limit = request.args.get('limit', 50, type=int)
-        offset = request.args.get('offset', 0, type=int)
-        
-        history = MileageService.get_by_vin(vin, limit=limit, offset=offset)
-        latest = MileageService.get_latest(vin)
-        
-        return jsonify({
-            'success': True,
-            'data': history,
-            'count': len(history),
-            'latest': latest
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-
-@mileage_bp.route('/<int:entry_id>', methods=['GET'])
+    vin = validated_vin(vin)
+    limit = clamp_limit(50)
+    offset = read_offset()
+    cursor = decode_cursor(request.args.get('cursor'))
+    
+    history, latest = MileageService.get_by_vin_with_latest(
+        vin, limit=limit, offset=offset, cursor=cursor
+    )
+    
+    return smart_response({
+        'success': True,
+        'data': history,
+        'count': len(history),
+        'next_cursor': next_cursor(history, limit),
+        'latest': latest
+    })
+
+
+@mileage_bp.route('/<int:entry_id>', methods=['GET', 'HEAD'])
+@etagged
 def get_mileage_entry(entry_id):
     """Get a single mileage entry by ID."""
-    try:
-        entry = MileageService.get_by_id(entry_id)
-        
-        if not entry:
-            return jsonify({
-                'success': False,
-                'error': 'Mileage entry not found'
-            }), 404
-        
+    if request.method == 'HEAD':
+        return '', 200 if MileageService.exists(entry_id) else 404
+    
+    entry = MileageService.get_by_id(entry_id)
+    
+    if not entry:
         return jsonify({
-            'success': True,
-            'data': entry
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+            'success': False,
+            'error': 'Mileage entry not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': entry
+    })
 
 
 @mileage_bp.route('', methods=['POST'])
 def create_mileage():
     """Record a new mileage entry."""
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': 'No data provided'
-            }), 400
-        
-        entry = MileageService.create(data)
-        
-        return jsonify({
-            'success': True,
-            'data': entry,
-            'message': 'Mileage recorded successfully'
-        }), 201
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    data = read_body(validate_mileage_create)
+    
+    entry = MileageService.create(data)
+    
+    return jsonify({
+        'success': True,
+        'data': entry,
+        'message': 'Mileage recorded successfully'
+    }), 201
 
 
 @mileage_bp.route('/<int:entry_id>', methods=['DELETE'])
 def delete_mileage(entry_id):
     """Delete a mileage entry."""
-    try:
-        MileageService.delete(entry_id)
-        
-        return jsonify({
-            'success': True,
-            'message': 'Mileage entry deleted successfully'
-        })
-    except NotFoundError as e:
-        return jsonify({'success': False, 'error': e.message}), 404
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    MileageService.delete(entry_id)
+    
+    return jsonify({
+        'success': True,
+        'message': 'Mileage entry deleted successfully'
+    })
 
 
 @mileage_bp.route('/vehicle/<vin>/average', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version, max_age=0)
 def get_average_daily_miles(vin):
     """Get average daily miles for a vehicle."""
-    try:
-        days = request.args.get('days', 30, type=int)
-        stats = MileageService.calculate_average_daily_miles(vin, days=days)
-        
-        return jsonify({
-            'success': True,
-            'data': stats
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    vin = validated_vin(vin)
+    days = clamp_arg('days', 30, MAX_DAYS)
+    stats = MileageService.calculate_average_daily_miles(vin, days=days)
+    
+    return jsonify({
+        'success': True,
+        'data': stats
+    })
 
 
 @mileage_bp.route('/vehicle/<vin>/monthly', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version, max_age=0)
 def get_monthly_mileage(vin):
     """Get monthly mileage summary for a vehicle."""
-    try:
-        months = request.args.get('months', 6, type=int)
-        summary = MileageService.get_monthly_summary(vin, months=months)
-        
-        return jsonify({
-            'success': True,
-            'data': summary
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    vin = validated_vin(vin)
+    months = clamp_arg('months', 6, MAX_MONTHS)
+    summary = MileageService.get_monthly_summary(vin, months=months)
+    
+    return jsonify({
+        'success': True,
+        'data': summary
+    })
 
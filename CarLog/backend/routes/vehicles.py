@@ -4,203 +4,137 @@ Vehicles API Routes
 RESTful endpoints for vehicle management.
 """
 
-from flask import Blueprint, request, jsonify
-import sys
-import os
+from flask import Blueprint, request
+import orjson
 import requests
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
 from services.vehicle_service import VehicleService
-from services.base_service import ValidationError, NotFoundError
+from services.analytics_service import AnalyticsService
+from services.vin_decoder_service import VinDecoderService, DECODE_TTL
+from routes._utils import (
+    clamp_limit,
+    read_offset,
+    list_response,
+    ok,
+    fail,
+    etagged,
+    cached_endpoint,
+    read_only,
+)
+from routes._schemas import read_body, validate_vin_batch, VIN_BATCH_ERROR
 
 vehicles_bp = Blueprint('vehicles', __name__)
 
 
+def _decoded_fields(vehicle):
+    """
+    A decoded VIN as returned to the client: vPIC's full field set ('raw')
+    is several times the size of the rest, so it is only included when the
+    request asks for it with ?raw=1.
+    """
+    if vehicle is None or request.args.get('raw') == '1':
+        return vehicle
+    return {key: value for key, value in vehicle.items() if key != 'raw'}
+
+
 @vehicles_bp.route('', methods=['GET'])
 def get_vehicles():
     """
     Get all vehicles.
     Query params: limit, offset, user_id
     """
-    try:
-        limit = request.args.get('limit', 100, type=int)
-        offset = request.args.get('offset', 0, type=int)
-        user_id = request.args.get('user_id', type=int)
-        
-        vehicles = VehicleService.get_all(limit=limit, offset=offset, user_id=user_id)
-        
-        return jsonify({
-            'success': True,
-            'data': vehicles,
-            'count': len(vehicles)
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    limit = clamp_limit(100)
+    offset = read_offset()
+    user_id = request.args.get('user_id', type=int)
+    
+    vehicles = VehicleService.get_all(limit=limit, offset=offset, user_id=user_id)
+    
+    return list_response(vehicles)
 
 
 @vehicles_bp.route('/<vin>', methods=['GET'])
+@etagged
 def get_vehicle(vin):
     """Get a single vehicle by VIN."""
-    try:
-        vehicle = VehicleService.get_by_vin(vin)
-        
-        if not vehicle:
-            return jsonify({
-                'success': False,
-                'error': 'Vehicle not found'
-            }), 404
-        
-        return jsonify({
-            'success': True,
-            'data': vehicle
-        })
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    vehicle = VehicleService.get_by_vin(vin)
+    
+    if not vehicle:
+        return fail('Vehicle not found', 404)
+    
+    return ok(data=vehicle)
 
 
 @vehicles_bp.route('/<vin>/summary', methods=['GET'])
+@cached_endpoint(AnalyticsService.get_data_version, max_age=0)
 def get_vehicle_summary(vin):
     """Get vehicle summary with stats."""
-    try:
-        summary = VehicleService.get_summary(vin)
-        
-        return jsonify({
-            'success': True,
-            'data': summary
-        })
-    except NotFoundError as e:
-        return jsonify({'success': False, 'error': e.message}), 404
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    summary = VehicleService.get_summary(vin)
+    
+    return ok(data=summary)
 
 
 @vehicles_bp.route('', methods=['POST'])
 def create_vehicle():
     """Create a new vehicle."""
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': 'No data provided'
-            }), 400
-        
-        vehicle = VehicleService.create(data)
-        
-        return jsonify({
-            'success': True,
-            'data': vehicle,
-            'message': 'Vehicle created successfully'
-        }), 201
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    data = request.get_json()
+    
+    if not data:
+        return fail('No data provided')
+    
+    vehicle = VehicleService.create(data)
+    
+    return ok(data=vehicle, message='Vehicle created successfully', status=201)
 
 
 @vehicles_bp.route('/<vin>', methods=['PUT', 'PATCH'])
 def update_vehicle(vin):
     """Update a vehicle."""
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': 'No data provided'
-            }), 400
-        
-        vehicle = VehicleService.update(vin, data)
-        
-        return jsonify({
-            'success': True,
-            'data': vehicle,
-            'message': 'Vehicle updated successfully'
-        })
-    except NotFoundError as e:
-        return jsonify({'success': False, 'error': e.message}), 404
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    data = request.get_json()
+    
+    if not data:
+        return fail('No data provided')
+    
+    vehicle = VehicleService.update(vin, data)
+    
+    return ok(data=vehicle, message='Vehicle updated successfully')
 
 
 @vehicles_bp.route('/<vin>', methods=['DELETE'])
 def delete_vehicle(vin):
     """Delete a vehicle and all related data."""
-    try:
-        # Delete vehicle (which will cascade delete related records)
-        # The VehicleService.delete() already explicitly deletes all related records
-        VehicleService.delete(vin)
-        
-        return jsonify({
-            'success': True,
-            'message': 'Vehicle and all related data deleted successfully'
-        })
-    except NotFoundError as e:
-        return jsonify({'success': False, 'error': e.message}), 404
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # Delete vehicle (which will cascade delete related records)
+    # The VehicleService.delete() already explicitly deletes all related records
+    VehicleService.delete(vin)
+    
+    return ok(message='Vehicle and all related data deleted successfully')
 
 
 @vehicles_bp.route('/<vin>/mileage', methods=['PUT'])
 def update_mileage(vin):
     """Update vehicle mileage."""
-    try:
-        data = request.get_json()
-        mileage = data.get('mileage') if data else None
-        
-        if mileage is None:
-            return jsonify({
-                'success': False,
-                'error': 'Mileage is required'
-            }), 400
-        
-        vehicle = VehicleService.update_mileage(vin, mileage)
-        
-        return jsonify({
-            'success': True,
-            'data': vehicle,
-            'message': 'Mileage updated successfully'
-        })
-    except NotFoundError as e:
-        return jsonify({'success': False, 'error': e.message}), 404
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    data = request.get_json()
+    mileage = data.get('mileage') if data else None
+    
+    if mileage is None:
+        return fail('Mileage is required')
+    
+    vehicle = VehicleService.update_mileage(vin, mileage)
+    
+    return ok(data=vehicle, message='Mileage updated successfully')
 
 
 @vehicles_bp.route('/search', methods=['GET'])
 def search_vehicles():
     """Search vehicles by make, model, or VIN."""
-    try:
-        query = request.args.get('q', '')
-        limit = request.args.get('limit', 20, type=int)
-        
-        if not query:
-            return jsonify({
-                'success': False,
-                'error': 'Search query is required'
-            }), 400
-        
-        vehicles = VehicleService.search(query, limit=limit)
-        
-        return jsonify({
-            'success': True,
-            'data': vehicles,
-            'count': len(vehicles)
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    query = request.args.get('q', '')
+    limit = clamp_limit(20)
+    
+    if not query:
+        return fail('Search query is required')
+    
+    vehicles = VehicleService.search(query, limit=limit)
+    
+    return list_response(vehicles)
 
 
 @vehicles_bp.route('/decode-vin/<vin>', methods=['GET'])
@@ -208,78 +142,51 @@ def decode_vin(vin):
     """
     Decode a VIN using NHTSA API.
     This endpoint proxies the NHTSA VIN decoder to avoid CORS issues.
+    Query params: raw (1 to include every vPIC field)
     """
-    try:
-        # Validate VIN length
-        if len(vin) != 17:
-            return jsonify({
-                'success': False,
-                'error': 'VIN must be exactly 17 characters'
-            }), 400
-        
-        # Call NHTSA API
-        nhtsa_url = f'https://vpic.nhtsa.dot.gov/api/vehicles/decodevin/{vin}?format=json'
-        
+    # Validate VIN length
+    if len(vin) != 17:
+        return fail('VIN must be exactly 17 characters')
+    
+    vehicle = VinDecoderService.cached(vin)
+    hit = vehicle is not None
+    if not hit:
         try:
-            response = requests.get(nhtsa_url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Parse results
-            results = data.get('Results', [])
-            decoded = {}
-            
-            for item in results:
-                variable = item.get('Variable')
-                value = item.get('Value')
-                if variable and value and value not in ['', 'Not Applicable']:
-                    decoded[variable] = value
-            
-            # Check if we got valid data
-            if not decoded.get('Make') and not decoded.get('Model'):
-                return jsonify({
-                    'success': False,
-                    'error': 'VIN not recognized or invalid'
-                }), 404
-            
-            return jsonify({
-                'success': True,
-                'data': {
-                    'vin': vin.upper(),
-                    'make': decoded.get('Make'),
-                    'model': decoded.get('Model'),
-                    'year': decoded.get('Model Year'),
-                    'trim': decoded.get('Trim'),
-                    'bodyClass': decoded.get('Body Class'),
-                    'vehicleType': decoded.get('Vehicle Type'),
-                    'driveType': decoded.get('Drive Type'),
-                    'fuelType': decoded.get('Fuel Type - Primary'),
-                    'engineCylinders': decoded.get('Engine Number of Cylinders'),
-                    'engineDisplacement': decoded.get('Displacement (L)'),
-                    'transmissionStyle': decoded.get('Transmission Style'),
-                    'doors': decoded.get('Doors'),
-                    'plantCountry': decoded.get('Plant Country'),
-                    'plantCity': decoded.get('Plant City'),
-                    'manufacturer': decoded.get('Manufacturer Name'),
-                    'errorCode': decoded.get('Error Code'),
-                    'errorText': decoded.get('Error Text'),
-                    'raw': decoded  # Include raw data for completeness
-                }
-            })
-            
+            vehicle = VinDecoderService.decode(vin)
         except requests.exceptions.Timeout:
-            return jsonify({
-                'success': False,
-                'error': 'VIN lookup timed out. Please try again.'
-            }), 504
-        except requests.exceptions.RequestException as e:
-            return jsonify({
-                'success': False,
-                'error': f'Failed to connect to VIN decoder service: {str(e)}'
-            }), 503
-            
-    except ValidationError as e:
-        return jsonify({'success': False, 'error': e.message}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+            return fail('VIN lookup timed out. Please try again.', 504)
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            return fail(f'Failed to connect to VIN decoder service: {str(e)}', 503)
+    
+    if vehicle is None:
+        return fail('VIN not recognized or invalid', 404)
+    
+    # Decodes never change, so browsers and CDNs may keep them as long as we do
+    response = ok(data=_decoded_fields(vehicle))
+    response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+    response.headers['Cache-Control'] = (
+        f'public, max-age={DECODE_TTL}, stale-while-revalidate=300'
+    )
+    return response
+
+
+@vehicles_bp.route('/decode-vin/batch', methods=['POST'])
+@read_only
+def decode_vins():
+    """
+    Decode several VINs with one NHTSA request.
+    Body: {"vins": [...]}; data maps each VIN to its details, or null if
+    it wasn't recognized.
+    Query params: raw (1 to include every vPIC field)
+    """
+    data = read_body(validate_vin_batch, VIN_BATCH_ERROR)
+    
+    try:
+        vehicles = VinDecoderService.decode_many(data['vins'])
+    except requests.exceptions.Timeout:
+        return fail('VIN lookup timed out. Please try again.', 504)
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+        return fail(f'Failed to connect to VIN decoder service: {str(e)}', 503)
+    
+    return ok(data={vin: _decoded_fields(vehicle) for vin, vehicle in vehicles.items()})
 
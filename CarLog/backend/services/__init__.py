@@ -13,6 +13,7 @@ from .trip_service import TripService
 from .analytics_service import AnalyticsService
 from .settings_service import SettingsService
 from .user_service import UserService
+from .vin_decoder_service import VinDecoderService
 
 __all__ = [
     'VehicleService',
@@ -24,5 +25,6 @@ __all__ = [
     'AnalyticsService',
     'SettingsService',
     'UserService',
+    'VinDecoderService',
 ]
 
@@ -6,105 +6,174 @@ Provides analytics and calculations for vehicle data.
 
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
-import sys
-import os
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import orjson
 
-from db.db_helper import connection, execute_query
+from db.db_helper import connection, select_tuples, select_described
 from services.base_service import validate_vin, ValidationError
 
 
+# One row summarizing every table the analytics read from; it changes
+# whenever a row is added, removed or updated (updated_at has one-second
+# resolution). {where} is either empty or a per-vehicle filter.
+_DATA_VERSION_SQL = """
+    SELECT
+        (SELECT COUNT(*) || ':' || COALESCE(MAX(updated_at), '') FROM vehicles {where}),
+        (SELECT COUNT(*) || ':' || COALESCE(MAX(updated_at), '') FROM repairs {where}),
+        (SELECT COUNT(*) || ':' || COALESCE(MAX(updated_at), '') FROM fuel_logs {where}),
+        (SELECT COUNT(*) || ':' || COALESCE(MAX(updated_at), '') FROM trips {where}),
+        (SELECT COUNT(*) || ':' || COALESCE(MAX(updated_at), '') FROM maintenance_intervals {where}),
+        (SELECT COUNT(*) || ':' || COALESCE(MAX(id), 0) FROM mileage_history {where})
+"""
+_DATA_VERSION_ALL = _DATA_VERSION_SQL.format(where='')
+_DATA_VERSION_VIN = _DATA_VERSION_SQL.format(where='WHERE vin = ?')
+
+# MPG between consecutive full-tank fill-ups over the last 11 of them:
+# miles since the previous fill-up (LEAD, as rows run newest first) divided
+# by the gallons bought. One row: average, latest, best, worst, count.
+_MPG_SQL = """
+    WITH recent AS (
+        SELECT gallons, odometer
+        FROM fuel_logs 
+        WHERE vin = :vin AND full_tank = 1
+        ORDER BY odometer DESC
+        LIMIT 11
+    ),
+    intervals AS (
+        SELECT 
+            odometer,
+            gallons,
+            odometer - LEAD(odometer) OVER (ORDER BY odometer DESC) as miles
+        FROM recent
+    ),
+    mpg AS (
+        SELECT odometer, miles / gallons as mpg
+        FROM intervals
+        WHERE gallons > 0 AND miles > 0
+    )
+    SELECT 
+        AVG(mpg),
+        (SELECT mpg FROM mpg ORDER BY odometer DESC LIMIT 1),
+        MAX(mpg),
+        MIN(mpg),
+        COUNT(*)
+    FROM mpg
+"""
+
+# Everything the dashboard shows, in one statement: the vehicle's columns
+# followed by _DASHBOARD_STATS aggregate columns (repairs, fuel, trips,
+# the _MPG_SQL row, then the upcoming and overdue maintenance as JSON
+# arrays). No row at all means there is no such vehicle.
+_DASHBOARD_SQL = f"""
+    WITH mpg_stats AS ({_MPG_SQL})
+    SELECT 
+        v.*,
+        r.*,
+        f.*,
+        t.*,
+        m.*,
+        (
+            SELECT json_group_array(
+                json_object('service_type', service_type, 'next_due_mileage', next_due_mileage)
+            )
+            FROM (
+                SELECT service_type, next_due_mileage
+                FROM maintenance_intervals 
+                WHERE vin = :vin AND next_due_mileage IS NOT NULL
+                ORDER BY next_due_mileage ASC
+                LIMIT 3
+            )
+        ),
+        (
+            SELECT json_group_array(
+                json_object('service_type', service_type, 'next_due_mileage', next_due_mileage)
+            )
+            FROM maintenance_intervals 
+            WHERE vin = :vin AND next_due_mileage < COALESCE(v.current_mileage, 0)
+        )
+    FROM vehicles v
+    CROSS JOIN (
+        SELECT 
+            COUNT(*),
+            COALESCE(SUM(cost), 0),
+            MAX(date)
+        FROM repairs WHERE vin = :vin
+    ) r
+    CROSS JOIN (
+        SELECT 
+            COUNT(*),
+            COALESCE(SUM(total_cost), 0),
+            COALESCE(SUM(gallons), 0)
+        FROM fuel_logs WHERE vin = :vin
+    ) f
+    CROSS JOIN (
+        SELECT 
+            COUNT(*),
+            COALESCE(SUM(distance), 0),
+            SUM(CASE WHEN is_business = 1 THEN distance ELSE 0 END)
+        FROM trips WHERE vin = :vin
+    ) t
+    CROSS JOIN mpg_stats m
+    WHERE v.vin = :vin
+"""
+_DASHBOARD_STATS = 16
+
+
 class AnalyticsService:
     """Service for analytics calculations."""
     
+    @classmethod
+    def get_data_version(cls, vin: Optional[str] = None) -> tuple:
+        """
+        Fingerprint of the data behind the analytics for one vehicle (or all
+        vehicles when vin is None). Used as a cache key, so no validation.
+        """
+        if vin is None:
+            return select_tuples(_DATA_VERSION_ALL)[0]
+        vin = vin.strip().upper()
+        return select_tuples(_DATA_VERSION_VIN, (vin,) * 6)[0]
+    
     @classmethod
     def get_vehicle_dashboard(cls, vin: str) -> Dict[str, Any]:
         """Get comprehensive dashboard data for a vehicle."""
         vin = validate_vin(vin)
         
-        # Get vehicle info
-        vehicle = execute_query(
-            "SELECT * FROM vehicles WHERE vin = ?",
-            (vin,), fetch_one=True
-        )
-        
-        if not vehicle:
+        columns, rows = select_described(_DASHBOARD_SQL, {'vin': vin})
+        if not rows:
             return {'error': 'Vehicle not found'}
         
-        # Get repair stats
-        repair_stats = execute_query("""
-            SELECT 
-                COUNT(*) as count,
-                COALESCE(SUM(cost), 0) as total_cost,
-                MAX(date) as last_repair_date
-            FROM repairs WHERE vin = ?
-        """, (vin,), fetch_one=True)
-        
-        # Get fuel stats
-        fuel_stats = execute_query("""
-            SELECT 
-                COUNT(*) as count,
-                COALESCE(SUM(total_cost), 0) as total_cost,
-                COALESCE(SUM(gallons), 0) as total_gallons,
-                MIN(odometer) as first_odometer,
-                MAX(odometer) as last_odometer
-            FROM fuel_logs WHERE vin = ?
-        """, (vin,), fetch_one=True)
-        
-        # Get trip stats
-        trip_stats = execute_query("""
-            SELECT 
-                COUNT(*) as count,
-                COALESCE(SUM(distance), 0) as total_miles,
-                SUM(CASE WHEN is_business = 1 THEN distance ELSE 0 END) as business_miles
-            FROM trips WHERE vin = ?
-        """, (vin,), fetch_one=True)
-        
-        # Calculate MPG
-        mpg_data = cls.calculate_mpg(vin)
-        
-        # Get upcoming maintenance
-        upcoming_maintenance = execute_query("""
-            SELECT service_type, next_due_mileage
-            FROM maintenance_intervals 
-            WHERE vin = ? AND next_due_mileage IS NOT NULL
-            ORDER BY next_due_mileage ASC
-            LIMIT 3
-        """, (vin,))
-        
-        # Get overdue maintenance
-        current_mileage = vehicle['current_mileage'] or 0
-        overdue = execute_query("""
-            SELECT service_type, next_due_mileage
-            FROM maintenance_intervals 
-            WHERE vin = ? AND next_due_mileage < ?
-        """, (vin, current_mileage))
+        split = len(columns) - _DASHBOARD_STATS
+        vehicle = dict(zip(columns[:split], rows[0][:split]))
+        (
+            repair_count, repair_cost, last_repair_date,
+            fill_ups, fuel_cost, total_gallons,
+            trip_count, trip_miles, business_miles,
+            average, last, best, worst, data_points,
+            upcoming, overdue
+        ) = rows[0][split:]
         
         return {
-            'vehicle': dict(vehicle),
-            'current_mileage': current_mileage,
+            'vehicle': vehicle,
+            'current_mileage': vehicle['current_mileage'] or 0,
             'repairs': {
-                'count': repair_stats['count'],
-                'total_cost': round(repair_stats['total_cost'], 2),
-                'last_repair_date': repair_stats['last_repair_date']
+                'count': repair_count,
+                'total_cost': round(repair_cost, 2),
+                'last_repair_date': last_repair_date
             },
             'fuel': {
-                'fill_ups': fuel_stats['count'],
-                'total_cost': round(fuel_stats['total_cost'], 2),
-                'total_gallons': round(fuel_stats['total_gallons'], 2)
+                'fill_ups': fill_ups,
+                'total_cost': round(fuel_cost, 2),
+                'total_gallons': round(total_gallons, 2)
             },
             'trips': {
-                'count': trip_stats['count'],
-                'total_miles': round(trip_stats['total_miles'], 1),
-                'business_miles': round(trip_stats['business_miles'] or 0, 1)
+                'count': trip_count,
+                'total_miles': round(trip_miles, 1),
+                'business_miles': round(business_miles or 0, 1)
             },
-            'mpg': mpg_data,
-            'upcoming_maintenance': [dict(m) for m in upcoming_maintenance],
-            'overdue_maintenance': [dict(m) for m in overdue],
-            'total_cost': round(
-                repair_stats['total_cost'] + fuel_stats['total_cost'], 2
-            )
+            'mpg': cls._mpg_stats(average, last, best, worst, data_points),
+            'upcoming_maintenance': orjson.loads(upcoming),
+            'overdue_maintenance': orjson.loads(overdue),
+            'total_cost': round(repair_cost + fuel_cost, 2)
         }
     
     @classmethod
@@ -112,29 +181,12 @@ class AnalyticsService:
         """Calculate MPG statistics for a vehicle."""
         vin = validate_vin(vin)
         
-        logs = execute_query("""
-            SELECT gallons, odometer
-            FROM fuel_logs 
-            WHERE vin = ? AND full_tank = 1
-            ORDER BY odometer DESC
-            LIMIT 11
-        """, (vin,))
-        
-        if len(logs) < 2:
-            return {
-                'average_mpg': None,
-                'last_mpg': None,
-                'data_points': 0
-            }
-        
-        mpg_values = []
-        for i in range(len(logs) - 1):
-            miles = logs[i]['odometer'] - logs[i + 1]['odometer']
-            gallons = logs[i]['gallons']
-            if gallons > 0 and miles > 0:
-                mpg_values.append(miles / gallons)
-        
-        if not mpg_values:
+        return cls._mpg_stats(*select_tuples(_MPG_SQL, {'vin': vin})[0])
+    
+    @staticmethod
+    def _mpg_stats(average, last, best, worst, data_points) -> Dict[str, Any]:
+        """Shape a _MPG_SQL row for the API."""
+        if not data_points:
             return {
                 'average_mpg': None,
                 'last_mpg': None,
@@ -142,11 +194,11 @@ class AnalyticsService:
             }
         
         return {
-            'average_mpg': round(sum(mpg_values) / len(mpg_values), 1),
-            'last_mpg': round(mpg_values[0], 1),
-            'best_mpg': round(max(mpg_values), 1),
-            'worst_mpg': round(min(mpg_values), 1),
-            'data_points': len(mpg_values)
+            'average_mpg': round(average, 1),
+            'last_mpg': round(last, 1),
+            'best_mpg': round(best, 1),
+            'worst_mpg': round(worst, 1),
+            'data_points': data_points
         }
     
     @classmethod
@@ -154,43 +206,40 @@ class AnalyticsService:
         """Calculate cost per mile for a vehicle."""
         vin = validate_vin(vin)
         
-        # Get total costs
-        costs = execute_query("""
+        # Get total costs and the mileage range, as plain tuples
+        repair_cost, fuel_cost, first, last = select_tuples("""
             SELECT 
-                (SELECT COALESCE(SUM(cost), 0) FROM repairs WHERE vin = ?) as repair_cost,
-                (SELECT COALESCE(SUM(total_cost), 0) FROM fuel_logs WHERE vin = ?) as fuel_cost
-        """, (vin, vin), fetch_one=True)
-        
-        # Get mileage range
-        mileage = execute_query("""
-            SELECT MIN(odometer) as first, MAX(odometer) as last
+                (SELECT COALESCE(SUM(cost), 0) FROM repairs WHERE vin = ?),
+                COALESCE(SUM(total_cost), 0),
+                MIN(odometer),
+                MAX(odometer)
             FROM fuel_logs WHERE vin = ?
-        """, (vin,), fetch_one=True)
+        """, (vin, vin))[0]
         
-        total_cost = costs['repair_cost'] + costs['fuel_cost']
-        total_miles = (mileage['last'] or 0) - (mileage['first'] or 0)
+        total_cost = repair_cost + fuel_cost
+        total_miles = (last or 0) - (first or 0)
         
         if total_miles <= 0:
             # Try using mileage history
-            mileage = execute_query("""
-                SELECT MIN(mileage) as first, MAX(mileage) as last
+            first, last = select_tuples("""
+                SELECT MIN(mileage), MAX(mileage)
                 FROM mileage_history WHERE vin = ?
-            """, (vin,), fetch_one=True)
-            total_miles = (mileage['last'] or 0) - (mileage['first'] or 0)
+            """, (vin,))[0]
+            total_miles = (last or 0) - (first or 0)
         
         cost_per_mile = total_cost / total_miles if total_miles > 0 else 0
         
         return {
             'total_cost': round(total_cost, 2),
-            'repair_cost': round(costs['repair_cost'], 2),
-            'fuel_cost': round(costs['fuel_cost'], 2),
+            'repair_cost': round(repair_cost, 2),
+            'fuel_cost': round(fuel_cost, 2),
             'total_miles': total_miles,
             'cost_per_mile': round(cost_per_mile, 3),
             'fuel_cost_per_mile': round(
-                costs['fuel_cost'] / total_miles if total_miles > 0 else 0, 3
+                fuel_cost / total_miles if total_miles > 0 else 0, 3
             ),
             'repair_cost_per_mile': round(
-                costs['repair_cost'] / total_miles if total_miles > 0 else 0, 3
+                repair_cost / total_miles if total_miles > 0 else 0, 3
             )
         }
     
@@ -200,49 +249,30 @@ class AnalyticsService:
         vin: str, 
         months: int = 12
     ) -> List[Dict[str, Any]]:
-        """Get monthly spending breakdown."""
+        """
+        Get monthly spending breakdown for the last `months` calendar
+        months, read from the trigger-maintained monthly_totals table.
+        """
         vin = validate_vin(vin)
         
-        # Get repair spending by month
-        repairs = execute_query("""
-            SELECT 
-                strftime('%Y-%m', date) as month,
-                SUM(cost) as amount
-            FROM repairs 
-            WHERE vin = ? AND date >= date('now', ?)
-            GROUP BY strftime('%Y-%m', date)
-        """, (vin, f'-{months} months'))
-        
-        # Get fuel spending by month
-        fuel = execute_query("""
-            SELECT 
-                strftime('%Y-%m', date) as month,
-                SUM(total_cost) as amount
-            FROM fuel_logs 
-            WHERE vin = ? AND date >= date('now', ?)
-            GROUP BY strftime('%Y-%m', date)
+        rows = select_tuples("""
+            SELECT month, repair_cost, repair_count, fuel_cost, fuel_count
+            FROM monthly_totals
+            WHERE vin = ? AND month >= strftime('%Y-%m', 'now', 'start of month', ?)
+                AND (repair_count > 0 OR fuel_count > 0)
+            ORDER BY month ASC
         """, (vin, f'-{months} months'))
         
-        # Combine into monthly totals
-        monthly = {}
-        for r in repairs:
-            month = r['month']
-            if month not in monthly:
-                monthly[month] = {'month': month, 'repairs': 0, 'fuel': 0}
-            monthly[month]['repairs'] = round(r['amount'], 2)
-        
-        for f in fuel:
-            month = f['month']
-            if month not in monthly:
-                monthly[month] = {'month': month, 'repairs': 0, 'fuel': 0}
-            monthly[month]['fuel'] = round(f['amount'], 2)
-        
-        # Calculate totals
         result = []
-        for month in sorted(monthly.keys()):
-            data = monthly[month]
-            data['total'] = round(data['repairs'] + data['fuel'], 2)
-            result.append(data)
+        for month, repair_cost, repair_count, fuel_cost, fuel_count in rows:
+            repairs = round(repair_cost, 2) if repair_count else 0
+            fuel = round(fuel_cost, 2) if fuel_count else 0
+            result.append({
+                'month': month,
+                'repairs': repairs,
+                'fuel': fuel,
+                'total': round(repairs + fuel, 2)
+            })
         
         return result
     
@@ -262,16 +292,16 @@ class AnalyticsService:
             GROUP BY service
             ORDER BY total_cost DESC
         """
-        results = execute_query(query, (vin,))
+        results = select_tuples(query, (vin,))
         
         return [
             {
-                'category': r['category'],
-                'count': r['count'],
-                'total_cost': round(r['total_cost'], 2),
-                'avg_cost': round(r['avg_cost'], 2)
+                'category': category,
+                'count': count,
+                'total_cost': round(total_cost, 2),
+                'avg_cost': round(avg_cost, 2)
             }
-            for r in results
+            for category, count, total_cost, avg_cost in results
         ]
     
     @classmethod
@@ -292,18 +322,18 @@ class AnalyticsService:
             GROUP BY strftime('%Y-%m', date)
             ORDER BY month ASC
         """
-        results = execute_query(query, (vin, f'-{months} months'))
+        results = select_tuples(query, (vin, f'-{months} months'))
         
         return [
             {
-                'month': r['month'],
-                'avg_price': round(r['avg_price'], 3),
-                'min_price': round(r['min_price'], 3),
-                'max_price': round(r['max_price'], 3),
-                'total_gallons': round(r['total_gallons'], 2),
-                'total_cost': round(r['total_cost'], 2)
+                'month': month,
+                'avg_price': round(avg_price, 3),
+                'min_price': round(min_price, 3),
+                'max_price': round(max_price, 3),
+                'total_gallons': round(total_gallons, 2),
+                'total_cost': round(total_cost, 2)
             }
-            for r in results
+            for month, avg_price, min_price, max_price, total_gallons, total_cost in results
         ]
     
     @classmethod
@@ -316,27 +346,36 @@ class AnalyticsService:
                 v.make,
                 v.model,
                 v.current_mileage,
-                COALESCE((SELECT SUM(cost) FROM repairs WHERE vin = v.vin), 0) as repair_cost,
-                COALESCE((SELECT SUM(total_cost) FROM fuel_logs WHERE vin = v.vin), 0) as fuel_cost,
-                COALESCE((SELECT COUNT(*) FROM repairs WHERE vin = v.vin), 0) as repair_count
+                COALESCE(r.repair_cost, 0) as repair_cost,
+                COALESCE(f.fuel_cost, 0) as fuel_cost,
+                COALESCE(r.repair_count, 0) as repair_count
             FROM vehicles v
+            LEFT JOIN (
+                SELECT vin, SUM(cost) as repair_cost, COUNT(*) as repair_count
+                FROM repairs GROUP BY vin
+            ) r ON r.vin = v.vin
+            LEFT JOIN (
+                SELECT vin, SUM(total_cost) as fuel_cost
+                FROM fuel_logs GROUP BY vin
+            ) f ON f.vin = v.vin
             ORDER BY v.make, v.model
         """
-        results = execute_query(query)
-        
         return [
             {
-                'vin': r['vin'],
-                'year': r['year'],
-                'make': r['make'],
-                'model': r['model'],
-                'display_name': f"{r['year']} {r['make']} {r['model']}",
-                'current_mileage': r['current_mileage'],
-                'repair_cost': round(r['repair_cost'], 2),
-                'fuel_cost': round(r['fuel_cost'], 2),
-                'total_cost': round(r['repair_cost'] + r['fuel_cost'], 2),
-                'repair_count': r['repair_count']
+                'vin': vin,
+                'year': year,
+                'make': make,
+                'model': model,
+                'display_name': f"{year} {make} {model}",
+                'current_mileage': current_mileage,
+                'repair_cost': round(repair_cost, 2),
+                'fuel_cost': round(fuel_cost, 2),
+                'total_cost': round(repair_cost + fuel_cost, 2),
+                'repair_count': repair_count
             }
-            for r in results
+            for (
+                vin, year, make, model, current_mileage,
+                repair_cost, fuel_cost, repair_count
+            ) in select_tuples(query)
         ]
 
@@ -5,25 +5,28 @@ Provides common CRUD operations and utilities for all services.
 """
 
 import logging
-from typing import Optional, List, Dict, Any, Tuple
-from datetime import datetime
-import sys
-import os
-
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import re
+from typing import Optional, List, Dict, Any, Tuple, Iterator
+from datetime import date, datetime
 
 from db.db_helper import (
     connection, 
+    transaction, 
     execute_query, 
     execute_insert, 
     execute_update, 
     execute_delete,
-    count_rows
+    bulk_insert,
+    count_rows,
+    iter_rows
 )
 
 logger = logging.getLogger(__name__)
 
+# A valid, normalized VIN: 17 upper-case characters, no I, O or Q
+_VIN_RE = re.compile(r'[A-HJ-NPR-Z0-9]{17}')
+_INVALID_VIN_CHARS = re.compile(r'[IOQ]')
+
 
 class ServiceError(Exception):
     """Base exception for service errors."""
@@ -87,57 +90,153 @@ class BaseService:
         query = f"SELECT * FROM {cls.table_name}"
         if order_by:
             query += f" ORDER BY {order_by} {order_dir}"
-        query += f" LIMIT ? OFFSET ?"
+        query += " LIMIT ? OFFSET ?"
         return execute_query(query, (limit, offset))
     
+    @classmethod
+    def iter_all(
+        cls, 
+        limit: int = 100, 
+        offset: int = 0,
+        order_by: str = None,
+        order_dir: str = "DESC"
+    ) -> Iterator[Dict[str, Any]]:
+        """Like get_all, but yields rows lazily (for streamed responses)."""
+        query = f"SELECT * FROM {cls.table_name}"
+        if order_by:
+            query += f" ORDER BY {order_by} {order_dir}"
+        query += " LIMIT ? OFFSET ?"
+        return iter_rows(query, (limit, offset))
+    
+    @classmethod
+    def _keyset_query(
+        cls, 
+        limit: int, 
+        offset: int, 
+        cursor: Optional[Tuple[Any, Any]], 
+        order_by: str
+    ) -> Tuple[str, tuple]:
+        """SQL and parameters for get_page/iter_page."""
+        order = f"ORDER BY {order_by} DESC, {cls.primary_key} DESC"
+        if cursor:
+            query = (
+                f"SELECT * FROM {cls.table_name} "
+                f"WHERE ({order_by}, {cls.primary_key}) < (?, ?) {order} LIMIT ?"
+            )
+            return query, (cursor[0], cursor[1], limit)
+        return f"SELECT * FROM {cls.table_name} {order} LIMIT ? OFFSET ?", (limit, offset)
+    
+    @classmethod
+    def get_page(
+        cls, 
+        limit: int = 50, 
+        offset: int = 0,
+        cursor: Optional[Tuple[Any, Any]] = None,
+        order_by: str = "date"
+    ) -> List[Dict[str, Any]]:
+        """
+        Records newest first by (order_by, primary key). cursor is that pair
+        for the last row of the previous page; when given, the page starts
+        right after it (no rows are skipped over) and offset is ignored.
+        """
+        return execute_query(*cls._keyset_query(limit, offset, cursor, order_by))
+    
+    @classmethod
+    def iter_page(
+        cls, 
+        limit: int = 50, 
+        offset: int = 0,
+        cursor: Optional[Tuple[Any, Any]] = None,
+        order_by: str = "date"
+    ) -> Iterator[Dict[str, Any]]:
+        """Like get_page, but yields rows lazily (for streamed responses)."""
+        return iter_rows(*cls._keyset_query(limit, offset, cursor, order_by))
+    
     @classmethod
     def get_by_id(cls, id_value: Any) -> Optional[Dict[str, Any]]:
         """Get a single record by primary key."""
         query = f"SELECT * FROM {cls.table_name} WHERE {cls.primary_key} = ?"
         return execute_query(query, (id_value,), fetch_one=True)
     
+    @classmethod
+    def prepare_new(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate and normalize the fields of a record about to be created.
+        Subclasses override this with their own checks.
+        """
+        return data
+    
     @classmethod
     def create(cls, data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new record."""
+        data = cls.prepare_new(data)
         cls.validate_required(data)
         filtered = cls.filter_allowed(data)
         
         new_id = execute_insert(cls.table_name, filtered)
+        # Tables keyed on a natural key (e.g. vehicles.vin) have no rowid
+        if cls.primary_key in filtered:
+            new_id = filtered[cls.primary_key]
         return cls.get_by_id(new_id)
     
+    @classmethod
+    def bulk_create(cls, rows: List[Dict[str, Any]]) -> int:
+        """
+        Create many records in one transaction and return how many were
+        inserted. Every row is validated before anything is written; a bad
+        row fails the whole batch, and the error names its index. Rows are
+        inserted with one executemany per distinct set of fields, so
+        omitted fields still get their column defaults.
+        """
+        batches: Dict[tuple, List[tuple]] = {}
+        for index, data in enumerate(rows):
+            try:
+                data = cls.prepare_new(data)
+                cls.validate_required(data)
+            except ValidationError as e:
+                raise ValidationError(f"Row {index}: {e.message}")
+            filtered = cls.filter_allowed(data)
+            batches.setdefault(tuple(filtered), []).append(tuple(filtered.values()))
+        
+        with transaction():
+            return sum(
+                bulk_insert(cls.table_name, values, list(columns))
+                for columns, values in batches.items()
+            )
+    
     @classmethod
     def update(cls, id_value: Any, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update an existing record."""
-        existing = cls.get_by_id(id_value)
-        if not existing:
-            raise NotFoundError(f"{cls.table_name} with {cls.primary_key}={id_value} not found")
-        
         filtered = cls.filter_allowed(data)
-        if not filtered:
-            return existing
+        if filtered:
+            # The UPDATE's row count doubles as the existence check
+            rows = execute_update(cls.table_name, filtered, f"{cls.primary_key} = ?", (id_value,))
+            record = cls.get_by_id(id_value) if rows else None
+        else:
+            record = cls.get_by_id(id_value)
         
-        execute_update(cls.table_name, filtered, f"{cls.primary_key} = ?", (id_value,))
-        return cls.get_by_id(id_value)
+        if not record:
+            raise NotFoundError(f"{cls.table_name} with {cls.primary_key}={id_value} not found")
+        return record
     
     @classmethod
     def delete(cls, id_value: Any) -> bool:
         """Delete a record by primary key."""
-        existing = cls.get_by_id(id_value)
-        if not existing:
-            raise NotFoundError(f"{cls.table_name} with {cls.primary_key}={id_value} not found")
-        
         rows = execute_delete(cls.table_name, f"{cls.primary_key} = ?", (id_value,))
-        return rows > 0
+        if not rows:
+            raise NotFoundError(f"{cls.table_name} with {cls.primary_key}={id_value} not found")
+        return True
     
     @classmethod
-    def count(cls, where: str = None, params: tuple = ()) -> int:
-        """Count records, optionally with a filter."""
-        return count_rows(cls.table_name, where, params)
+    def count(cls, where: str = None, params: tuple = (), approximate: bool = False) -> int:
+        """Count records, optionally with a filter (see count_rows for approximate)."""
+        return count_rows(cls.table_name, where, params, approximate=approximate)
     
     @classmethod
     def exists(cls, id_value: Any) -> bool:
-        """Check if a record exists."""
-        return cls.get_by_id(id_value) is not None
+        """Check if a record exists without fetching the row."""
+        query = f"SELECT 1 FROM {cls.table_name} WHERE {cls.primary_key} = ? LIMIT 1"
+        return execute_query(query, (id_value,), fetch_one=True) is not None
 
 
 def validate_vin(vin: str) -> str:
@@ -145,14 +244,19 @@ def validate_vin(vin: str) -> str:
     if not vin:
         raise ValidationError("VIN is required")
     
+    if _VIN_RE.fullmatch(vin):
+        return vin
+    
     vin = vin.strip().upper()
+    if _VIN_RE.fullmatch(vin):
+        return vin
     
+    # Only malformed VINs get here; work out which message applies
     if len(vin) != 17:
         raise ValidationError("VIN must be exactly 17 characters")
     
     # VINs cannot contain I, O, or Q
-    invalid_chars = set('IOQ')
-    if any(c in invalid_chars for c in vin):
+    if _INVALID_VIN_CHARS.search(vin):
         raise ValidationError("VIN cannot contain I, O, or Q")
     
     return vin
@@ -164,7 +268,12 @@ def validate_date(date_str: str) -> str:
         raise ValidationError("Date is required")
     
     try:
-        datetime.strptime(date_str, '%Y-%m-%d')
+        # Zero-padded dates (nearly all of them) take fromisoformat's C
+        # parser; strptime still handles the looser forms it accepts
+        if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+            date.fromisoformat(date_str)
+        else:
+            datetime.strptime(date_str, '%Y-%m-%d')
         return date_str
     except ValueError:
         raise ValidationError("Date must be in YYYY-MM-DD format")
@@ -4,13 +4,9 @@ Fuel Log Service
 Handles fuel log tracking and MPG calculations.
 """
 
-from typing import Optional, List, Dict, Any
-import sys
-import os
+from typing import Optional, List, Dict, Any, Tuple, Iterator
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
-from db.db_helper import connection, execute_query
+from db.db_helper import connection, execute_query, iter_rows, select_tuples, select_described, head_join_sql
 from services.base_service import (
     BaseService, 
     ValidationError, 
@@ -21,6 +17,34 @@ from services.base_service import (
 )
 
 
+# One page of a vehicle's fuel logs, newest first (see FuelLogService.get_by_vin)
+_PAGE_SQL = """
+    SELECT * FROM fuel_logs 
+    WHERE vin = ?
+    ORDER BY date DESC, id DESC
+    LIMIT ? OFFSET ?
+"""
+_PAGE_AFTER_CURSOR_SQL = """
+    SELECT * FROM fuel_logs 
+    WHERE vin = ? AND (date, id) < (?, ?)
+    ORDER BY date DESC, id DESC
+    LIMIT ?
+"""
+
+_COST_SUMMARY_SQL = """
+    SELECT 
+        COUNT(*) as fill_ups,
+        COALESCE(SUM(gallons), 0) as total_gallons,
+        COALESCE(SUM(total_cost), 0) as total_cost,
+        COALESCE(AVG(price_per_gallon), 0) as avg_price,
+        MIN(odometer) as first_odometer,
+        MAX(odometer) as last_odometer
+    FROM fuel_logs 
+    WHERE vin = ?
+"""
+_COST_SUMMARY_COLUMNS = 6
+
+
 class FuelLogService(BaseService):
     """Service for fuel log CRUD operations."""
     
@@ -32,23 +56,71 @@ class FuelLogService(BaseService):
         "date", "station", "fuel_type", "full_tank", "notes"
     ]
     
+    @staticmethod
+    def _page_query(vin: str, limit: int, offset: int, cursor) -> Tuple[str, tuple]:
+        """SQL and parameters for one page of a vehicle's fuel logs."""
+        if cursor:
+            return _PAGE_AFTER_CURSOR_SQL, (vin, cursor[0], cursor[1], limit)
+        return _PAGE_SQL, (vin, limit, offset)
+    
     @classmethod
     def get_by_vin(
         cls, 
         vin: str, 
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[Tuple[str, int]] = None
     ) -> List[Dict[str, Any]]:
-        """Get all fuel logs for a vehicle."""
-        vin = validate_vin(vin)
+        """
+        Get all fuel logs for a vehicle, newest first.
         
-        query = """
-            SELECT * FROM fuel_logs 
-            WHERE vin = ?
-            ORDER BY date DESC, odometer DESC
-            LIMIT ? OFFSET ?
+        cursor is the (date, id) of the last row of the previous page; when
+        given, the page starts right after it and offset is ignored.
+        """
+        vin = validate_vin(vin)
+        return execute_query(*cls._page_query(vin, limit, offset, cursor))
+    
+    @classmethod
+    def iter_by_vin(
+        cls, 
+        vin: str, 
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[Tuple[str, int]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazy get_by_vin for streamed responses. The VIN is validated here,
+        before the first row is requested.
         """
-        return execute_query(query, (vin, limit, offset))
+        vin = validate_vin(vin)
+        return iter_rows(*cls._page_query(vin, limit, offset, cursor))
+    
+    @classmethod
+    def get_by_vin_with_summary(
+        cls, 
+        vin: str, 
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[Tuple[str, int]] = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """get_by_vin() and get_cost_summary() in a single query."""
+        vin = validate_vin(vin)
+        page_sql, page_params = cls._page_query(vin, limit, offset, cursor)
+        
+        # The summary CTE always yields one row; an empty page leaves the
+        # joined log columns NULL
+        columns, rows = select_described(
+            head_join_sql('summary', _COST_SUMMARY_SQL, page_sql), (vin,) + page_params
+        )
+        
+        split = _COST_SUMMARY_COLUMNS
+        log_columns = columns[split:]
+        id_index = split + log_columns.index('id')
+        logs = [
+            dict(zip(log_columns, row[split:]))
+            for row in rows if row[id_index] is not None
+        ]
+        return logs, cls._summarize(*rows[0][:split])
     
     @classmethod
     def create(cls, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -115,8 +187,8 @@ class FuelLogService(BaseService):
         vin = validate_vin(vin)
         
         # Get fuel logs with full tanks, ordered by odometer
-        logs = execute_query("""
-            SELECT gallons, odometer, date
+        logs = select_tuples("""
+            SELECT gallons, odometer
             FROM fuel_logs 
             WHERE vin = ? AND full_tank = 1
             ORDER BY odometer DESC
@@ -132,9 +204,8 @@ class FuelLogService(BaseService):
             }
         
         mpg_values = []
-        for i in range(len(logs) - 1):
-            miles = logs[i]['odometer'] - logs[i + 1]['odometer']
-            gallons = logs[i]['gallons']
+        for (gallons, odometer), (_, prev_odometer) in zip(logs, logs[1:]):
+            miles = odometer - prev_odometer
             if gallons > 0 and miles > 0:
                 mpg_values.append(miles / gallons)
         
@@ -158,20 +229,14 @@ class FuelLogService(BaseService):
     def get_cost_summary(cls, vin: str) -> Dict[str, Any]:
         """Get fuel cost summary for a vehicle."""
         vin = validate_vin(vin)
-        
-        result = execute_query("""
-            SELECT 
-                COUNT(*) as fill_ups,
-                COALESCE(SUM(gallons), 0) as total_gallons,
-                COALESCE(SUM(total_cost), 0) as total_cost,
-                COALESCE(AVG(price_per_gallon), 0) as avg_price,
-                MIN(odometer) as first_odometer,
-                MAX(odometer) as last_odometer
-            FROM fuel_logs 
-            WHERE vin = ?
-        """, (vin,), fetch_one=True)
-        
-        if not result or result['fill_ups'] == 0:
+        return cls._summarize(*select_tuples(_COST_SUMMARY_SQL, (vin,))[0])
+    
+    @staticmethod
+    def _summarize(
+        fill_ups, total_gallons, total_cost, avg_price, first_odometer, last_odometer
+    ) -> Dict[str, Any]:
+        """Shape a _COST_SUMMARY_SQL row into the summary payload."""
+        if not fill_ups:
             return {
                 'fill_ups': 0,
                 'total_gallons': 0,
@@ -181,16 +246,16 @@ class FuelLogService(BaseService):
                 'cost_per_mile': 0
             }
         
-        total_miles = (result['last_odometer'] or 0) - (result['first_odometer'] or 0)
+        total_miles = (last_odometer or 0) - (first_odometer or 0)
         cost_per_mile = (
-            result['total_cost'] / total_miles if total_miles > 0 else 0
+            total_cost / total_miles if total_miles > 0 else 0
         )
         
         return {
-            'fill_ups': result['fill_ups'],
-            'total_gallons': round(result['total_gallons'], 2),
-            'total_cost': round(result['total_cost'], 2),
-            'avg_price_per_gallon': round(result['avg_price'], 3),
+            'fill_ups': fill_ups,
+            'total_gallons': round(total_gallons, 2),
+            'total_cost': round(total_cost, 2),
+            'avg_price_per_gallon': round(avg_price, 3),
             'total_miles': total_miles,
             'cost_per_mile': round(cost_per_mile, 3)
         }
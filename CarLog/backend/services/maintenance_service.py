@@ -6,10 +6,6 @@ Handles maintenance intervals and scheduling.
 
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
-import sys
-import os
-
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from db.db_helper import connection, execute_query, execute_insert
 from services.base_service import (
@@ -4,14 +4,10 @@ Mileage Service
 Handles mileage tracking and history.
 """
 
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Iterator
 from datetime import datetime
-import sys
-import os
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
-from db.db_helper import connection, execute_query, execute_update
+from db.db_helper import connection, execute_query, iter_rows, execute_update, select_described, head_join_sql
 from services.base_service import (
     BaseService, 
     ValidationError, 
@@ -22,6 +18,28 @@ from services.base_service import (
 )
 
 
+# One page of a vehicle's history, newest first (see MileageService.get_by_vin)
+_PAGE_SQL = """
+    SELECT * FROM mileage_history 
+    WHERE vin = ?
+    ORDER BY date DESC, id DESC
+    LIMIT ? OFFSET ?
+"""
+_PAGE_AFTER_CURSOR_SQL = """
+    SELECT * FROM mileage_history 
+    WHERE vin = ? AND (date, id) < (?, ?)
+    ORDER BY date DESC, id DESC
+    LIMIT ?
+"""
+
+_LATEST_SQL = """
+    SELECT * FROM mileage_history 
+    WHERE vin = ?
+    ORDER BY mileage DESC
+    LIMIT 1
+"""
+
+
 class MileageService(BaseService):
     """Service for mileage history CRUD operations."""
     
@@ -30,23 +48,74 @@ class MileageService(BaseService):
     required_fields = ["vin", "mileage", "date"]
     allowed_fields = ["vin", "mileage", "date", "source", "notes"]
     
+    @staticmethod
+    def _page_query(vin: str, limit: int, offset: int, cursor) -> Tuple[str, tuple]:
+        """SQL and parameters for one page of a vehicle's mileage history."""
+        if cursor:
+            return _PAGE_AFTER_CURSOR_SQL, (vin, cursor[0], cursor[1], limit)
+        return _PAGE_SQL, (vin, limit, offset)
+    
     @classmethod
     def get_by_vin(
         cls, 
         vin: str, 
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[Tuple[str, int]] = None
     ) -> List[Dict[str, Any]]:
-        """Get mileage history for a vehicle."""
-        vin = validate_vin(vin)
+        """
+        Get mileage history for a vehicle, newest first.
         
-        query = """
-            SELECT * FROM mileage_history 
-            WHERE vin = ?
-            ORDER BY date DESC, mileage DESC
-            LIMIT ? OFFSET ?
+        cursor is the (date, id) of the last row of the previous page; when
+        given, the page starts right after it and offset is ignored.
+        """
+        vin = validate_vin(vin)
+        return execute_query(*cls._page_query(vin, limit, offset, cursor))
+    
+    @classmethod
+    def iter_by_vin(
+        cls, 
+        vin: str, 
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[Tuple[str, int]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazy get_by_vin for streamed responses. The VIN is validated here,
+        before the first row is requested.
         """
-        return execute_query(query, (vin, limit, offset))
+        vin = validate_vin(vin)
+        return iter_rows(*cls._page_query(vin, limit, offset, cursor))
+    
+    @classmethod
+    def get_by_vin_with_latest(
+        cls, 
+        vin: str, 
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[Tuple[str, int]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """get_by_vin() and get_latest() in a single query."""
+        vin = validate_vin(vin)
+        page_sql, page_params = cls._page_query(vin, limit, offset, cursor)
+        
+        # Each row is the latest reading followed by one page row; no
+        # latest reading means the vehicle has no history at all
+        columns, rows = select_described(
+            head_join_sql('latest', _LATEST_SQL, page_sql), (vin,) + page_params
+        )
+        
+        if not rows:
+            return [], None
+        
+        split = len(columns) // 2
+        page_columns = columns[split:]
+        id_index = split + page_columns.index('id')
+        history = [
+            dict(zip(page_columns, row[split:]))
+            for row in rows if row[id_index] is not None
+        ]
+        return history, dict(zip(columns[:split], rows[0][:split]))
     
     @classmethod
     def create(cls, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -81,13 +150,7 @@ class MileageService(BaseService):
         """Get the latest mileage reading for a vehicle."""
         vin = validate_vin(vin)
         
-        query = """
-            SELECT * FROM mileage_history 
-            WHERE vin = ?
-            ORDER BY mileage DESC
-            LIMIT 1
-        """
-        return execute_query(query, (vin,), fetch_one=True)
+        return execute_query(_LATEST_SQL, (vin,), fetch_one=True)
     
     @classmethod
     def get_by_date_range(
@@ -4,13 +4,9 @@ Repair Service
 Handles all repair-related business logic and data access.
 """
 
-from typing import Optional, List, Dict, Any
-import sys
-import os
+from typing import Optional, List, Dict, Any, Tuple, Iterator
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
-from db.db_helper import connection, execute_query
+from db.db_helper import connection, execute_query, iter_rows, select_tuples, select_described, head_join_sql
 from services.base_service import (
     BaseService, 
     ValidationError, 
@@ -20,6 +16,27 @@ from services.base_service import (
     validate_positive_number
 )
 
+# One page of a vehicle's repairs, newest first (see RepairService.get_by_vin)
+_PAGE_SQL = """
+    SELECT * FROM repairs 
+    WHERE vin = ?
+    ORDER BY date DESC, id DESC
+    LIMIT ? OFFSET ?
+"""
+_PAGE_AFTER_CURSOR_SQL = """
+    SELECT * FROM repairs 
+    WHERE vin = ? AND (date, id) < (?, ?)
+    ORDER BY date DESC, id DESC
+    LIMIT ?
+"""
+
+_TOTAL_COST_SQL = "SELECT COALESCE(SUM(cost), 0) as total FROM repairs WHERE vin = ?"
+# Total cost and number of a vehicle's repairs, for get_by_vin_with_total
+_TOTALS_SQL = (
+    "SELECT COALESCE(SUM(cost), 0) as total, COUNT(*) as total_count "
+    "FROM repairs WHERE vin = ?"
+)
+
 
 class RepairService(BaseService):
     """Service for repair CRUD operations."""
@@ -32,27 +49,99 @@ class RepairService(BaseService):
         "date", "shop_name", "notes"
     ]
     
+    @staticmethod
+    def _page_query(vin: str, limit: int, offset: int, cursor) -> Tuple[str, tuple]:
+        """SQL and parameters for one page of a vehicle's repairs."""
+        if cursor:
+            return _PAGE_AFTER_CURSOR_SQL, (vin, cursor[0], cursor[1], limit)
+        return _PAGE_SQL, (vin, limit, offset)
+    
     @classmethod
     def get_by_vin(
         cls, 
         vin: str, 
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[Tuple[str, int]] = None
     ) -> List[Dict[str, Any]]:
-        """Get all repairs for a vehicle."""
+        """
+        Get all repairs for a vehicle, newest first.
+        
+        cursor is the (date, id) of the last row of the previous page; when
+        given, the page starts right after it and offset is ignored.
+        """
+        vin = validate_vin(vin)
+        return execute_query(*cls._page_query(vin, limit, offset, cursor))
+    
+    @classmethod
+    def iter_by_vin(
+        cls, 
+        vin: str, 
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[Tuple[str, int]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazy get_by_vin for streamed responses. The VIN is validated here,
+        before the first row is requested.
+        """
+        vin = validate_vin(vin)
+        return iter_rows(*cls._page_query(vin, limit, offset, cursor))
+    
+    @classmethod
+    def get_by_vin_with_total(
+        cls, 
+        vin: str, 
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[Tuple[str, int]] = None
+    ) -> Tuple[List[Dict[str, Any]], float, int]:
+        """
+        get_by_vin() and get_total_cost() in a single query, plus how many
+        repairs the vehicle has in all (for paging).
+        """
+        vin = validate_vin(vin)
+        page_sql, page_params = cls._page_query(vin, limit, offset, cursor)
+        
+        # The totals CTE always yields one row; an empty page leaves the
+        # joined repair columns NULL
+        columns, rows = select_described(
+            head_join_sql('totals', _TOTALS_SQL, page_sql), (vin,) + page_params
+        )
+        
+        repair_columns = columns[2:]
+        id_index = 2 + repair_columns.index('id')
+        repairs = [
+            dict(zip(repair_columns, row[2:]))
+            for row in rows if row[id_index] is not None
+        ]
+        total_cost, total_count = rows[0][:2]
+        return repairs, total_cost, total_count
+    
+    @classmethod
+    def get_by_vin_summary_json(cls, vin: str, limit: int = 50) -> str:
+        """
+        A vehicle's repairs as a JSON array of {service, cost, date},
+        newest first, rendered by SQLite (the legacy /repair/repairs shape).
+        """
         vin = validate_vin(vin)
         
         query = """
-            SELECT * FROM repairs 
-            WHERE vin = ?
-            ORDER BY date DESC, id DESC
-            LIMIT ? OFFSET ?
+            SELECT json_group_array(
+                json_object('service', service, 'cost', cost, 'date', date)
+            )
+            FROM (
+                SELECT service, cost, date FROM repairs 
+                WHERE vin = ?
+                ORDER BY date DESC, id DESC
+                LIMIT ?
+            )
         """
-        return execute_query(query, (vin, limit, offset))
+        return select_tuples(query, (vin, limit))[0][0]
     
     @classmethod
-    def create(cls, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new repair record."""
+    def prepare_new(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a new repair record (see create and bulk_create)."""
         # Validate VIN
         data['vin'] = validate_vin(data.get('vin', ''))
         
@@ -69,7 +158,7 @@ class RepairService(BaseService):
         if 'mileage' in data and data['mileage'] is not None:
             data['mileage'] = int(validate_positive_number(data['mileage'], 'Mileage'))
         
-        return super().create(data)
+        return data
     
     @classmethod
     def update(cls, repair_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -92,10 +181,7 @@ class RepairService(BaseService):
         """Get total repair cost for a vehicle."""
         vin = validate_vin(vin)
         
-        result = execute_query(
-            "SELECT COALESCE(SUM(cost), 0) as total FROM repairs WHERE vin = ?",
-            (vin,), fetch_one=True
-        )
+        result = execute_query(_TOTAL_COST_SQL, (vin,), fetch_one=True)
         return result['total'] if result else 0
     
     @classmethod
@@ -117,6 +203,17 @@ class RepairService(BaseService):
         """
         return execute_query(query, (vin, start_date, end_date))
     
+    @classmethod
+    def delete_orphaned(cls) -> int:
+        """
+        Delete repairs whose vehicle no longer exists, returning how many
+        went. One anti-join statement, probing vehicles by primary key.
+        """
+        return execute_query("""
+            DELETE FROM repairs 
+            WHERE NOT EXISTS (SELECT 1 FROM vehicles v WHERE v.vin = repairs.vin)
+        """)
+    
     @classmethod
     def get_recent(cls, vin: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Get most recent repairs for a vehicle."""
@@ -5,14 +5,25 @@ Handles user and application settings.
 """
 
 from typing import Optional, List, Dict, Any
-import sys
-import os
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
-from db.db_helper import connection, execute_query, execute_insert
+from db.db_helper import connection, transaction, execute_query, bulk_insert, select_tuples
 from services.base_service import BaseService, ValidationError
 
+_DATA_VERSION_SQL = "SELECT COUNT(*), COALESCE(MAX(updated_at), '') FROM settings"
+
+# "user_id IS ?" also matches the global (NULL user) rows, which UNIQUE(key,
+# user_id) does not cover, so these two stand in for an upsert. The UPDATE
+# skips rows that already hold the value: repeated saves of an unchanged
+# setting write nothing and leave updated_at (the cache version) alone.
+_UPDATE_CHANGED_SQL = (
+    "UPDATE settings SET value = ?, updated_at = datetime('now') "
+    "WHERE key = ? AND user_id IS ? AND value IS NOT ?"
+)
+_INSERT_MISSING_SQL = (
+    "INSERT INTO settings (key, value, user_id) "
+    "SELECT ?, ?, ? WHERE NOT EXISTS "
+    "(SELECT 1 FROM settings WHERE key = ? AND user_id IS ?)"
+)
 
 # Default settings
 DEFAULT_SETTINGS = {
@@ -36,6 +47,11 @@ class SettingsService(BaseService):
     required_fields = ["key"]
     allowed_fields = ["key", "value", "user_id"]
     
+    @classmethod
+    def get_data_version(cls) -> tuple:
+        """Fingerprint of the settings table, used as a response cache key."""
+        return select_tuples(_DATA_VERSION_SQL)[0]
+    
     @classmethod
     def get(cls, key: str, user_id: int = None) -> Optional[str]:
         """Get a setting value by key."""
@@ -60,38 +76,38 @@ class SettingsService(BaseService):
     
     @classmethod
     def set(cls, key: str, value: str, user_id: int = None) -> Dict[str, Any]:
-        """Set a setting value."""
+        """Set a setting value. Saving the value a setting already has is a no-op."""
         if not key:
             raise ValidationError("Setting key is required")
         
-        # Check if setting exists
-        query = "SELECT id FROM settings WHERE key = ?"
-        params = [key]
-        
-        if user_id:
-            query += " AND user_id = ?"
-            params.append(user_id)
-        else:
-            query += " AND user_id IS NULL"
-        
-        existing = execute_query(query, tuple(params), fetch_one=True)
+        user_id = user_id or None
+        with connection() as conn:
+            updated = conn.execute(_UPDATE_CHANGED_SQL, (value, key, user_id, value)).rowcount
+            if not updated:
+                conn.execute(_INSERT_MISSING_SQL, (key, value, user_id, key, user_id))
+        return {'key': key, 'value': value, 'user_id': user_id}
+    
+    @classmethod
+    def set_bulk(cls, values: Dict[str, Any], user_id: int = None) -> Dict[str, Any]:
+        """
+        Set several settings in one transaction (two executemany statements),
+        for clients that batch up changes instead of saving each one.
+        """
+        if not values or not all(values):
+            raise ValidationError("Setting key is required")
         
-        if existing:
-            # Update existing
-            with connection() as conn:
-                conn.execute(
-                    "UPDATE settings SET value = ?, updated_at = datetime('now') WHERE id = ?",
-                    (value, existing['id'])
-                )
-            return {'key': key, 'value': value, 'user_id': user_id}
-        else:
-            # Create new
-            execute_insert('settings', {
-                'key': key,
-                'value': value,
-                'user_id': user_id
-            })
-            return {'key': key, 'value': value, 'user_id': user_id}
+        user_id = user_id or None
+        items = list(values.items())
+        with transaction() as conn:
+            conn.executemany(
+                _UPDATE_CHANGED_SQL,
+                [(value, key, user_id, value) for key, value in items]
+            )
+            conn.executemany(
+                _INSERT_MISSING_SQL,
+                [(key, value, user_id, key, user_id) for key, value in items]
+            )
+        return dict(values)
     
     @classmethod
     def get_all(cls, user_id: int = None) -> Dict[str, str]:
@@ -145,12 +161,11 @@ class SettingsService(BaseService):
                 conn.execute(query)
         
         # Insert defaults
-        for key, value in DEFAULT_SETTINGS.items():
-            execute_insert('settings', {
-                'key': key,
-                'value': value,
-                'user_id': user_id
-            })
+        bulk_insert(
+            'settings',
+            [(key, value, user_id) for key, value in DEFAULT_SETTINGS.items()],
+            ['key', 'value', 'user_id']
+        )
         
         return dict(DEFAULT_SETTINGS)
     
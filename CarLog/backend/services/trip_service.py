@@ -4,14 +4,10 @@ Trip Service
 Handles trip tracking and mileage logging for business/personal trips.
 """
 
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Iterator
 from datetime import datetime
-import sys
-import os
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
-from db.db_helper import connection, execute_query
+from db.db_helper import connection, execute_query, iter_rows, select_described, head_join_sql
 from services.base_service import (
     BaseService, 
     ValidationError, 
@@ -21,6 +17,45 @@ from services.base_service import (
     validate_positive_number
 )
 
+# One page of a vehicle's trips, newest first (see TripService.get_by_vin)
+_PAGE_SQL = """
+    SELECT * FROM trips 
+    WHERE vin = ?
+    ORDER BY date DESC, id DESC
+    LIMIT ? OFFSET ?
+"""
+_PAGE_AFTER_CURSOR_SQL = """
+    SELECT * FROM trips 
+    WHERE vin = ? AND (date, id) < (?, ?)
+    ORDER BY date DESC, id DESC
+    LIMIT ?
+"""
+
+# Trip mileage totals, for all of a vehicle's trips or one year's
+_MILEAGE_SUMMARY_SQL = """
+    SELECT 
+        COUNT(*) as total_trips,
+        COALESCE(SUM(distance), 0) as total_miles,
+        SUM(CASE WHEN is_business = 1 THEN distance ELSE 0 END) as business_miles,
+        SUM(CASE WHEN is_business = 0 THEN distance ELSE 0 END) as personal_miles,
+        SUM(CASE WHEN is_business = 1 THEN 1 ELSE 0 END) as business_trips,
+        SUM(CASE WHEN is_business = 0 THEN 1 ELSE 0 END) as personal_trips
+    FROM trips 
+    WHERE {where}
+"""
+_MILEAGE_SUMMARY_ALL_SQL = _MILEAGE_SUMMARY_SQL.format(where="vin = ?")
+_MILEAGE_SUMMARY_BY_YEAR_SQL = _MILEAGE_SUMMARY_SQL.format(
+    where="vin = ? AND strftime('%Y', date) = ?"
+)
+_MILEAGE_SUMMARY_COLUMNS = 6
+
+# A vehicle's business trips, newest first, for all years or one year
+_BUSINESS_ALL_SQL = "SELECT * FROM trips WHERE vin = ? AND is_business = 1 ORDER BY date DESC"
+_BUSINESS_BY_YEAR_SQL = (
+    "SELECT * FROM trips WHERE vin = ? AND is_business = 1 "
+    "AND strftime('%Y', date) = ? ORDER BY date DESC"
+)
+
 # Common trip purposes
 TRIP_PURPOSES = ['Commute', 'Business', 'Personal', 'Road Trip', 'Errand', 'Medical', 'Other']
 
@@ -36,27 +71,100 @@ class TripService(BaseService):
         "end_mileage", "distance", "date", "purpose", "is_business", "notes"
     ]
     
+    @staticmethod
+    def _page_query(vin: str, limit: int, offset: int, cursor) -> Tuple[str, tuple]:
+        """SQL and parameters for one page of a vehicle's trips."""
+        if cursor:
+            return _PAGE_AFTER_CURSOR_SQL, (vin, cursor[0], cursor[1], limit)
+        return _PAGE_SQL, (vin, limit, offset)
+    
+    @staticmethod
+    def _summary_query(vin: str, year: int = None) -> Tuple[str, tuple]:
+        """SQL and parameters for get_mileage_summary()."""
+        if year:
+            return _MILEAGE_SUMMARY_BY_YEAR_SQL, (vin, str(year))
+        return _MILEAGE_SUMMARY_ALL_SQL, (vin,)
+    
+    @staticmethod
+    def _business_query(vin: str, year: int = None) -> Tuple[str, tuple]:
+        """SQL and parameters for get_business_trips()."""
+        if year:
+            return _BUSINESS_BY_YEAR_SQL, (vin, str(year))
+        return _BUSINESS_ALL_SQL, (vin,)
+    
+    @classmethod
+    def _with_summary(
+        cls, 
+        trips_sql: str, 
+        trips_params: tuple, 
+        vin: str, 
+        year: int = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Run a trips query and the mileage summary as one statement."""
+        summary_sql, summary_params = cls._summary_query(vin, year)
+        
+        # The summary CTE always yields one row; no matching trips leaves
+        # the joined trip columns NULL
+        columns, rows = select_described(
+            head_join_sql('summary', summary_sql, trips_sql), summary_params + trips_params
+        )
+        
+        split = _MILEAGE_SUMMARY_COLUMNS
+        trip_columns = columns[split:]
+        id_index = split + trip_columns.index('id')
+        trips = [
+            dict(zip(trip_columns, row[split:]))
+            for row in rows if row[id_index] is not None
+        ]
+        return trips, dict(zip(columns[:split], rows[0][:split]))
+    
     @classmethod
     def get_by_vin(
         cls, 
         vin: str, 
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[Tuple[str, int]] = None
     ) -> List[Dict[str, Any]]:
-        """Get all trips for a vehicle."""
-        vin = validate_vin(vin)
+        """
+        Get all trips for a vehicle, newest first.
         
-        query = """
-            SELECT * FROM trips 
-            WHERE vin = ?
-            ORDER BY date DESC, id DESC
-            LIMIT ? OFFSET ?
+        cursor is the (date, id) of the last row of the previous page; when
+        given, the page starts right after it and offset is ignored.
         """
-        return execute_query(query, (vin, limit, offset))
+        vin = validate_vin(vin)
+        return execute_query(*cls._page_query(vin, limit, offset, cursor))
     
     @classmethod
-    def create(cls, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new trip record."""
+    def iter_by_vin(
+        cls, 
+        vin: str, 
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[Tuple[str, int]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazy get_by_vin for streamed responses. The VIN is validated here,
+        before the first row is requested.
+        """
+        vin = validate_vin(vin)
+        return iter_rows(*cls._page_query(vin, limit, offset, cursor))
+    
+    @classmethod
+    def get_by_vin_with_summary(
+        cls, 
+        vin: str, 
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[Tuple[str, int]] = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """get_by_vin() and get_mileage_summary() in a single query."""
+        vin = validate_vin(vin)
+        return cls._with_summary(*cls._page_query(vin, limit, offset, cursor), vin)
+    
+    @classmethod
+    def prepare_new(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a new trip record (see create and bulk_create)."""
         data['vin'] = validate_vin(data.get('vin', ''))
         data['date'] = validate_date(data.get('date', ''))
         
@@ -85,7 +193,7 @@ class TripService(BaseService):
         else:
             data['is_business'] = 1 if data['is_business'] else 0
         
-        return super().create(data)
+        return data
     
     @classmethod
     def update(cls, trip_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -117,41 +225,24 @@ class TripService(BaseService):
     ) -> List[Dict[str, Any]]:
         """Get all business trips for a vehicle."""
         vin = validate_vin(vin)
-        
-        query = "SELECT * FROM trips WHERE vin = ? AND is_business = 1"
-        params = [vin]
-        
-        if year:
-            query += " AND strftime('%Y', date) = ?"
-            params.append(str(year))
-        
-        query += " ORDER BY date DESC"
-        return execute_query(query, tuple(params))
+        return execute_query(*cls._business_query(vin, year))
+    
+    @classmethod
+    def get_business_trips_with_summary(
+        cls, 
+        vin: str, 
+        year: int = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """get_business_trips() and get_mileage_summary() in a single query."""
+        vin = validate_vin(vin)
+        return cls._with_summary(*cls._business_query(vin, year), vin, year)
     
     @classmethod
     def get_mileage_summary(cls, vin: str, year: int = None) -> Dict[str, Any]:
         """Get trip mileage summary."""
         vin = validate_vin(vin)
         
-        where_clause = "vin = ?"
-        params = [vin]
-        
-        if year:
-            where_clause += " AND strftime('%Y', date) = ?"
-            params.append(str(year))
-        
-        query = f"""
-            SELECT 
-                COUNT(*) as total_trips,
-                COALESCE(SUM(distance), 0) as total_miles,
-                SUM(CASE WHEN is_business = 1 THEN distance ELSE 0 END) as business_miles,
-                SUM(CASE WHEN is_business = 0 THEN distance ELSE 0 END) as personal_miles,
-                SUM(CASE WHEN is_business = 1 THEN 1 ELSE 0 END) as business_trips,
-                SUM(CASE WHEN is_business = 0 THEN 1 ELSE 0 END) as personal_trips
-            FROM trips 
-            WHERE {where_clause}
-        """
-        result = execute_query(query, tuple(params), fetch_one=True)
+        result = execute_query(*cls._summary_query(vin, year), fetch_one=True)
         
         if not result:
             return {
@@ -5,14 +5,25 @@ Handles local user management.
 """
 
 from typing import Optional, List, Dict, Any
-import sys
-import os
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
-from db.db_helper import connection, execute_query
+from db.db_helper import connection, execute_query, select_tuples
 from services.base_service import BaseService, ValidationError, NotFoundError
 
+# Vehicle count, repair count/total and fuel log count/total for one user,
+# as a single row
+_USER_STATS_SQL = """
+    SELECT 
+        (SELECT COUNT(*) FROM vehicles WHERE user_id = ?),
+        r.count, r.total, f.count, f.total
+    FROM 
+        (SELECT COUNT(*) as count, COALESCE(SUM(cost), 0) as total
+         FROM repairs JOIN vehicles v ON repairs.vin = v.vin
+         WHERE v.user_id = ?) AS r,
+        (SELECT COUNT(*) as count, COALESCE(SUM(total_cost), 0) as total
+         FROM fuel_logs JOIN vehicles v ON fuel_logs.vin = v.vin
+         WHERE v.user_id = ?) AS f
+"""
+
 
 class UserService(BaseService):
     """Service for user CRUD operations."""
@@ -98,38 +109,21 @@ class UserService(BaseService):
     @classmethod
     def get_user_stats(cls, user_id: int) -> Dict[str, Any]:
         """Get statistics for a user."""
-        # Get vehicle count
-        vehicles = execute_query(
-            "SELECT COUNT(*) as count FROM vehicles WHERE user_id = ?",
-            (user_id,), fetch_one=True
-        )
-        
-        # Get total repair cost
-        repairs = execute_query("""
-            SELECT COUNT(*) as count, COALESCE(SUM(cost), 0) as total
-            FROM repairs r
-            JOIN vehicles v ON r.vin = v.vin
-            WHERE v.user_id = ?
-        """, (user_id,), fetch_one=True)
-        
-        # Get total fuel cost
-        fuel = execute_query("""
-            SELECT COUNT(*) as count, COALESCE(SUM(total_cost), 0) as total
-            FROM fuel_logs f
-            JOIN vehicles v ON f.vin = v.vin
-            WHERE v.user_id = ?
-        """, (user_id,), fetch_one=True)
+        (
+            vehicle_count, 
+            repair_count, 
+            repair_total, 
+            fuel_log_count, 
+            fuel_total
+        ) = select_tuples(_USER_STATS_SQL, (user_id,) * 3)[0]
         
         return {
-            'vehicle_count': vehicles['count'] if vehicles else 0,
-            'repair_count': repairs['count'] if repairs else 0,
-            'repair_total_cost': round(repairs['total'] if repairs else 0, 2),
-            'fuel_log_count': fuel['count'] if fuel else 0,
-            'fuel_total_cost': round(fuel['total'] if fuel else 0, 2),
-            'total_cost': round(
-                (repairs['total'] if repairs else 0) + 
-                (fuel['total'] if fuel else 0), 2
-            )
+            'vehicle_count': vehicle_count,
+            'repair_count': repair_count,
+            'repair_total_cost': round(repair_total, 2),
+            'fuel_log_count': fuel_log_count,
+            'fuel_total_cost': round(fuel_total, 2),
+            'total_cost': round(repair_total + fuel_total, 2)
         }
 
 
@@ -5,12 +5,8 @@ Handles all vehicle-related business logic and data access.
 """
 
 from typing import Optional, List, Dict, Any
-import sys
-import os
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
-from db.db_helper import connection, execute_query
+from db.db_helper import connection, execute_query, execute_delete
 from services.base_service import (
     BaseService, 
     ValidationError, 
@@ -113,14 +109,14 @@ class VehicleService(BaseService):
         
         # Explicitly delete related records to ensure cascade works
         # (SQLite foreign keys should handle this, but being explicit)
-        from db.db_helper import execute_delete
-        
-        # Delete in order: trips, fuel_logs, repairs, maintenance_intervals, mileage_history
+        # Delete in order: trips, fuel_logs, repairs, maintenance_intervals,
+        # mileage_history, then the monthly_totals rows the triggers zeroed
         execute_delete('trips', 'vin = ?', (vin,))
         execute_delete('fuel_logs', 'vin = ?', (vin,))
         execute_delete('repairs', 'vin = ?', (vin,))
         execute_delete('maintenance_intervals', 'vin = ?', (vin,))
         execute_delete('mileage_history', 'vin = ?', (vin,))
+        execute_delete('monthly_totals', 'vin = ?', (vin,))
         
         # Finally delete the vehicle
         return super().delete(vin)
@@ -0,0 +1,196 @@
+"""
+VIN Decoder Service
+===================
+Looks up VINs with the NHTSA vPIC API (used by /api/vehicles/decode-vin).
+"""
+
+import logging
+import os
+from typing import Optional, Dict, Any, List
+
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.cache import TTLCache
+
+try:
+    import redis
+except ImportError:  # optional; each worker then keeps its own cache only
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# The flat "Values" endpoints: one object per VIN keyed by field name, rather
+# than a ~140-entry list of {Variable, Value} pairs
+NHTSA_DECODE_URL = 'https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVINValues/{vin}?format=json'
+NHTSA_BATCH_URL = 'https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVINValuesBatch/'
+# Most VINs vPIC accepts in one batch request
+NHTSA_BATCH_SIZE = 50
+# (connect, read) seconds: a dead host fails fast, a slow decode may take longer
+NHTSA_TIMEOUT = (3, 10)
+
+# One pooled session per process: lookups reuse kept-alive TLS connections
+# to vPIC instead of opening one per request. Under gevent workers each
+# wait yields the worker to other requests, so the pool is sized for many
+# concurrent lookups. Connection failures and vPIC's transient 502/503/504s
+# are retried twice with backoff; read timeouts are not, to bound the wait.
+# Batch decodes are POSTs but read-only, so they are retried the same way.
+# (requests already asks for gzip, which shrinks the long Results array.)
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=64,
+    max_retries=Retry(
+        total=2,
+        read=0,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({'GET', 'POST'}),
+    ),
+))
+
+# A VIN always decodes to the same vehicle, so successful lookups are kept
+# for a long time: in this process, and in Redis (shared by every worker
+# and surviving restarts) when CARLOG_REDIS_URL is set
+DECODE_TTL = 30 * 24 * 60 * 60
+_decoded = TTLCache(maxsize=1024, ttl=DECODE_TTL)
+
+REDIS_URL = os.environ.get('CARLOG_REDIS_URL')
+_redis = redis.Redis.from_url(REDIS_URL) if redis is not None and REDIS_URL else None
+
+# vPIC placeholders for "no value"
+_EMPTY_VALUES = frozenset({'', 'Not Applicable'})
+
+# Our field name -> vPIC's
+_FIELDS = {
+    'make': 'Make',
+    'model': 'Model',
+    'year': 'ModelYear',
+    'trim': 'Trim',
+    'bodyClass': 'BodyClass',
+    'vehicleType': 'VehicleType',
+    'driveType': 'DriveType',
+    'fuelType': 'FuelTypePrimary',
+    'engineCylinders': 'EngineCylinders',
+    'engineDisplacement': 'DisplacementL',
+    'transmissionStyle': 'TransmissionStyle',
+    'doors': 'Doors',
+    'plantCountry': 'PlantCountry',
+    'plantCity': 'PlantCity',
+    'manufacturer': 'Manufacturer',
+    'errorCode': 'ErrorCode',
+    'errorText': 'ErrorText',
+}
+
+
+class VinDecoderService:
+    """Decodes VINs through NHTSA vPIC, caching the results."""
+    
+    @classmethod
+    def cached(cls, vin: str) -> Optional[Dict[str, Any]]:
+        """A previously decoded VIN's details, or None if not cached."""
+        vin = vin.upper()
+        vehicle = _decoded.get(vin)
+        if vehicle is not None or _redis is None:
+            return vehicle
+        
+        try:
+            raw = _redis.get(cls._redis_key(vin))
+        except redis.RedisError as e:
+            logger.warning("VIN cache read failed: %s", e)
+            return None
+        if raw is None:
+            return None
+        vehicle = orjson.loads(raw)
+        _decoded.set(vin, vehicle)
+        return vehicle
+    
+    @classmethod
+    def decode(cls, vin: str) -> Optional[Dict[str, Any]]:
+        """
+        Decode a VIN into the vehicle details the frontend uses.
+        
+        Returns None when vPIC doesn't recognize the VIN. Network failures
+        raise requests exceptions (Timeout, RequestException), and an
+        unreadable reply raises orjson.JSONDecodeError.
+        """
+        vin = vin.upper()
+        cached = cls.cached(vin)
+        if cached is not None:
+            return cached
+        
+        response = _session.get(NHTSA_DECODE_URL.format(vin=vin), timeout=NHTSA_TIMEOUT)
+        response.raise_for_status()
+        results = orjson.loads(response.content).get('Results', [])
+        
+        vehicle = cls._to_vehicle(vin, results[0]) if results else None
+        if vehicle is not None:
+            cls._store(vin, vehicle)
+        return vehicle
+    
+    @classmethod
+    def decode_many(cls, vins: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Decode several VINs, mapping each (upper-cased) to its details or
+        None. Cached VINs are answered locally; the rest are looked up
+        NHTSA_BATCH_SIZE at a time with vPIC's batch endpoint, so a list of
+        VINs costs one round trip instead of one per VIN. Raises like decode.
+        """
+        decoded = {}
+        missing = []
+        for vin in dict.fromkeys(vin.upper() for vin in vins):
+            decoded[vin] = cls.cached(vin)
+            if decoded[vin] is None:
+                missing.append(vin)
+        
+        for start in range(0, len(missing), NHTSA_BATCH_SIZE):
+            batch = missing[start:start + NHTSA_BATCH_SIZE]
+            response = _session.post(
+                NHTSA_BATCH_URL,
+                data={'format': 'json', 'data': ';'.join(batch)},
+                timeout=NHTSA_TIMEOUT
+            )
+            response.raise_for_status()
+            for result in orjson.loads(response.content).get('Results', []):
+                vin = (result.get('VIN') or '').upper()
+                if vin not in decoded:
+                    continue
+                vehicle = cls._to_vehicle(vin, result)
+                if vehicle is not None:
+                    decoded[vin] = vehicle
+                    cls._store(vin, vehicle)
+        return decoded
+    
+    @staticmethod
+    def _to_vehicle(vin: str, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The details the frontend uses from one vPIC result, or None if unrecognized."""
+        decoded = {
+            key: value for key, value in result.items()
+            if value and value not in _EMPTY_VALUES
+        }
+        
+        # Check if we got valid data
+        if not decoded.get('Make') and not decoded.get('Model'):
+            return None
+        
+        vehicle = {'vin': vin}
+        for field, key in _FIELDS.items():
+            vehicle[field] = decoded.get(key)
+        vehicle['raw'] = decoded  # Every field, for clients that ask for it
+        return vehicle
+    
+    @staticmethod
+    def _redis_key(vin: str) -> str:
+        return f'carlog:vin:decode:{vin}'
+    
+    @classmethod
+    def _store(cls, vin: str, vehicle: Dict[str, Any]) -> None:
+        _decoded.set(vin, vehicle)
+        if _redis is None:
+            return
+        try:
+            _redis.setex(cls._redis_key(vin), DECODE_TTL, orjson.dumps(vehicle))
+        except redis.RedisError as e:
+            logger.warning("VIN cache write failed: %s", e)
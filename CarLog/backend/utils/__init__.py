@@ -7,22 +7,24 @@ Used across routes and services for logging, formatting, and validation.
 
 import datetime
 import logging
+import os
+
+# Setup basic logging (file output only when CARLOG_LOG_FILE is set)
+_log_handlers = [logging.StreamHandler()]
+if os.environ.get("CARLOG_LOG_FILE"):
+    _log_handlers.append(logging.FileHandler(os.environ["CARLOG_LOG_FILE"]))
 
-# Setup basic logging
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("carlog_backend.log"),
-        logging.StreamHandler()
-    ]
+    handlers=_log_handlers
 )
 
 logger = logging.getLogger(__name__)
 
 def log_request(route_name: str, vin: str):
     """Log when a route is accessed with a VIN."""
-    logger.info(f"Accessed route '{route_name}' with VIN: {vin}")
+    logger.info("Accessed route '%s' with VIN: %s", route_name, vin)
 
 def format_date(timestamp=None):
     """Return a human-readable date/time string."""